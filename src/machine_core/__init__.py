@@ -19,20 +19,35 @@ v0.4.1 adds:
 - rebuild_agent() now accepts toolsets= parameter for mixed-mode (OpenAPI + MCP) filtering
 """
 
-from .core.config import AgentConfig, MCPServerModel, SYSTEM_PROMPT
-from .core.agent_core import AgentCore
-from .core.agent_base import BaseAgent
-from .core.file_processor import FileProcessor, ProcessedFile
-from .core.openapi_tools import generate_tools_from_openapi, fetch_openapi_spec
-from .core.vector_store import VectorStore, Embedder, SearchResult
-from .core.tool_filter import ToolFilterManager, ToolFilterResult, filter_mcp_toolsets
-from .core.document_store import DocumentStore
+import importlib
+
+from .core.config import AgentConfig, MCPServerModel, get_system_prompt
+
+# Everything past the config is imported on first attribute access, so
+# "from machine_core import AgentConfig" doesn't load pydantic-ai, LanceDB
+# and the rest of the agent stack.
+_LAZY = {
+    "AgentCore": ".core.agent_core",
+    "BaseAgent": ".core.agent_base",
+    "FileProcessor": ".core.file_processor",
+    "ProcessedFile": ".core.file_processor",
+    "generate_tools_from_openapi": ".core.openapi_tools",
+    "fetch_openapi_spec": ".core.openapi_tools",
+    "VectorStore": ".core.vector_store",
+    "Embedder": ".core.vector_store",
+    "SearchResult": ".core.vector_store",
+    "ToolFilterManager": ".core.tool_filter",
+    "ToolFilterResult": ".core.tool_filter",
+    "filter_mcp_toolsets": ".core.tool_filter",
+    "DocumentStore": ".core.document_store",
+}
 
 __all__ = [
     # Core (v0.1.0+)
     "AgentConfig",
     "MCPServerModel",
     "SYSTEM_PROMPT",
+    "get_system_prompt",
     "AgentCore",
     "BaseAgent",
     # File processing (v0.4.0)
@@ -52,3 +67,19 @@ __all__ = [
     # Document store (v0.4.0)
     "DocumentStore",
 ]
+
+
+def __getattr__(name):
+    # SYSTEM_PROMPT is read from prompts/system.txt on first access
+    if name == "SYSTEM_PROMPT":
+        return get_system_prompt()
+    if name in _LAZY:
+        module = importlib.import_module(_LAZY[name], __name__)
+        obj = getattr(module, name)
+        globals()[name] = obj
+        return obj
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,11 +1,19 @@
-"""Agent implementations for different use cases."""
+"""Agent implementations for different use cases.
 
-from .chat_agent import ChatAgent
-from .cli_agent import CLIAgent
-from .receipt_processor_agent import ReceiptProcessorAgent
-from .twitter_bot_agent import TwitterBotAgent
-from .rag_chat_agent import RAGChatAgent
-from .memory_master_agent import MemoryMasterAgent
+Agents are imported lazily on first attribute access, so importing one agent
+does not load the dependencies of all the others.
+"""
+
+import importlib
+
+_LAZY = {
+    'ChatAgent': '.chat_agent',
+    'CLIAgent': '.cli_agent',
+    'ReceiptProcessorAgent': '.receipt_processor_agent',
+    'TwitterBotAgent': '.twitter_bot_agent',
+    'RAGChatAgent': '.rag_chat_agent',
+    'MemoryMasterAgent': '.memory_master_agent',
+}
 
 __all__ = [
     'ChatAgent',
@@ -15,3 +23,16 @@ __all__ = [
     'RAGChatAgent',
     'MemoryMasterAgent',
 ]
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        module = importlib.import_module(_LAZY[name], __name__)
+        obj = getattr(module, name)
+        globals()[name] = obj
+        return obj
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
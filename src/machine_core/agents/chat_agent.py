@@ -3,7 +3,7 @@
 from pathlib import Path
 from typing import Optional, Union
 from core.agent_base import BaseAgent
-from ..core.config import AgentConfig
+from ..core.config import AgentConfig, get_config
 
 
 class ChatAgent(BaseAgent):
@@ -17,8 +17,14 @@ class ChatAgent(BaseAgent):
         self,
         model_name: Optional[str] = None,
         mcp_config_path: str = "mcp.json",
-        agent_config: Optional[AgentConfig] = None
+        agent_config: Optional[AgentConfig] = None,
+        draft_model_name: Optional[str] = None,
     ):
+        if draft_model_name:
+            # Copy so a caller-supplied config isn't mutated
+            agent_config = (agent_config or get_config()).model_copy(
+                update={"draft_model_name": draft_model_name}
+            )
         super().__init__(
             model_name=model_name,
             system_prompt="You are a helpful AI assistant with access to various tools and a knowledge base.",
@@ -26,10 +32,19 @@ class ChatAgent(BaseAgent):
             agent_config=agent_config
         )
     
-    async def run(self, query: str, image_paths: Optional[Union[str, Path, list]] = None):
+    def run(
+        self,
+        query: str,
+        image_paths: Optional[Union[str, Path, list]] = None,
+        text_only: bool = False,
+    ):
         """Run a streaming chat query.
         
-        Yields streaming events for real-time UI updates.
+        Returns the run_query_stream() async generator directly, so callers
+        iterate the underlying stream without an extra wrapper per event.
+        
+        With text_only=True, thinking/tool events are dropped, for consumers
+        that only show text. Text deltas are already merged by
+        run_query_stream() (agent_config.stream_coalesce_ms).
         """
-        async for event in self.run_query_stream(query, image_paths):
-            yield event
+        return self.run_query_stream(query, image_paths, text_only=text_only)
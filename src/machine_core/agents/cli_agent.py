@@ -1,15 +1,26 @@
 """CLI agent for command-line usage."""
 
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Optional, Union
 from core.agent_base import BaseAgent
 from ..core.config import AgentConfig
 
 
+@dataclass
+class CLIResult:
+    """Collected result of a CLIAgent run (mirrors AgentRunResult.output)."""
+
+    output: str = ""
+    thinking: Optional[str] = None
+    usage: dict = field(default_factory=dict)
+
+
 class CLIAgent(BaseAgent):
     """CLI agent for command-line usage.
     
-    Uses non-streaming execution for simple CLI output.
+    Runs on the streaming engine and collects the result, so tool calls
+    start as soon as the model emits them.
     Perfect for: Terminal commands, cron jobs, scripts
     """
     
@@ -29,7 +40,33 @@ class CLIAgent(BaseAgent):
     async def run(self, query: str, image_paths: Optional[Union[str, Path, list]] = None):
         """Run a single CLI query.
         
-        Returns complete result after execution.
+        Returns complete result after execution: a CLIResult, or
+        {"output": "Error: ..."} on failure (same contract as run_query).
+        With agent_config.enable_result_cache, a question another run
+        already answered is returned from the cache without a model call.
         """
-        result = await self.run_query(query, image_paths)
-        return result
+        cache_key = None
+        if query and self.agent_config.enable_result_cache:
+            images, image_error = await self._process_images(image_paths)
+            if not image_error:
+                cache_key, cached = await self._cached_result(query, images)
+                if cached is not None:
+                    self._append_messages(cached.new_messages())
+                    return CLIResult(output=cached.output)
+        
+        async for event in self.run_query_stream(query, image_paths):
+            if event["type"] == "final":
+                if cache_key is not None:
+                    # run_query_stream() records the completed turn last
+                    await self._store_result(
+                        cache_key, event["content"], self._history_turns[-1]
+                    )
+                return CLIResult(
+                    output=event["content"],
+                    thinking=event.get("thinking"),
+                    usage=event.get("usage") or {},
+                )
+            if event["type"] == "error":
+                return {"output": event["content"]}
+        
+        return {"output": "Error: Agent returned empty result."}
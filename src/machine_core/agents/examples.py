@@ -22,7 +22,7 @@ if __name__ == "__main__":
     async def main():
         # Example 1: Chat agent
         chat_agent = ChatAgent()
-        async for event in chat_agent.run("What is the capital of France?"):
+        async for event in chat_agent.run("What is the capital of France?", text_only=True):
             if event['type'] == 'text_delta':
                 print(event['content'], end='', flush=True)
         print()
@@ -5,14 +5,46 @@ from core.agent_base import BaseAgent
 from loguru import logger
 
 
+EXTRACTION_PROMPT = """Analyze this conversation and extract:
+1. Entities (people, places, concepts)
+2. Relationships between entities
+3. Key facts and information
+
+Conversation: {text}
+
+Then update the knowledge graph using the Neo4j tools."""
+
+EXTRACTION_BATCH_PROMPT = """Analyze each of the following {count} conversations and extract:
+1. Entities (people, places, concepts)
+2. Relationships between entities
+3. Key facts and information
+
+Conversations:
+{conversations}
+
+Then update the knowledge graph using the Neo4j tools for every conversation."""
+
+
 class MemoryMasterAgent(BaseAgent):
     """Memory master that maintains knowledge graph.
     
     Reads chats, extracts entities/relations, updates knowledge graph.
     Perfect for: Knowledge extraction, graph maintenance, memory consolidation
+
+    Idles until notify_new_chats() is called (e.g. from an asyncpg
+    LISTEN/NOTIFY listener or a Redis subscriber) instead of polling.
+    poll_interval is only a safety net for missed notifications.
+    Conversations are packed `conversations_per_prompt` to a prompt, and up
+    to `concurrency` prompts are sent to the LLM at once. Lower
+    conversations_per_prompt for long conversations or small context windows.
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        poll_interval: float = 300.0,
+        concurrency: int = 8,
+        conversations_per_prompt: int = 4,
+    ):
         super().__init__(
             system_prompt="""You are a knowledge graph maintainer.
 Extract entities, relationships, and facts from conversations.
@@ -20,6 +52,10 @@ Update the Neo4j knowledge graph with new information.
 Identify connections between existing knowledge.""",
             mcp_config_path="mcp_neo4j.json"
         )
+        self.poll_interval = poll_interval
+        self._new_chats = asyncio.Event()
+        self.concurrency = concurrency
+        self.conversations_per_prompt = max(1, conversations_per_prompt)
     
     async def run(self):
         """Process conversations and update knowledge graph."""
@@ -27,38 +63,103 @@ Identify connections between existing knowledge.""",
         
         while True:
             try:
+                # Clear before querying so a notification that lands mid-query
+                # still wakes the next wait
+                self._new_chats.clear()
+                
                 # Get unprocessed conversations
                 conversations = await self._get_unprocessed_chats()
                 
                 if not conversations:
-                    logger.info("No new conversations to process")
-                    break
+                    logger.info("No new conversations to process, waiting")
+                    await self._wait_for_chats()
+                    continue
                 
-                for conv in conversations:
-                    logger.info(f"Processing conversation: {conv['id']}")
-                    
-                    # Extract knowledge
-                    result = await self.run_query(
-                        f"""Analyze this conversation and extract:
-1. Entities (people, places, concepts)
-2. Relationships between entities
-3. Key facts and information
-
-Conversation: {conv['text']}
+                k = self.conversations_per_prompt
+                chunks = [conversations[i:i + k] for i in range(0, len(conversations), k)]
+                failed = await self._process_chunks(chunks)
+                
+                if failed < len(conversations):
+                    # The graph changed, so cached RAG answers may be stale.
+                    # Imported here to keep the agents package lazy.
+                    from .rag_chat_agent import RAGChatAgent
 
-Then update the knowledge graph using the Neo4j tools."""
-                    )
-                    
-                    # Mark as processed
-                    await self._mark_processed(conv['id'])
+                    RAGChatAgent.invalidate_cache()
                 
-                # Wait before next batch
-                await asyncio.sleep(300)  # 5 minutes
+                if failed:
+                    # Failed conversations stay unprocessed; back off before retrying them
+                    await asyncio.sleep(60)
                 
             except Exception as e:
                 logger.error(f"Error processing conversations: {e}")
                 await asyncio.sleep(60)  # Wait 1 minute on error
     
+    async def _process_chunks(self, chunks: list[list[dict]]) -> int:
+        """Extract knowledge from groups of conversations, one LLM call each.
+
+        Chunks run concurrently through run_query_batch, so each gets its own
+        empty history and the MCP toolsets are reset once, not per chunk.
+        Only chunks whose query succeeded are marked processed.
+
+        Returns:
+            Number of conversations that failed and stay unprocessed
+        """
+        for chunk in chunks:
+            logger.info(f"Processing conversation(s): {[conv['id'] for conv in chunk]}")
+        
+        results = await self.run_query_batch(
+            [self._build_extraction_prompt(chunk) for chunk in chunks],
+            max_concurrency=self.concurrency,
+        )
+        
+        failed = 0
+        done = []
+        for chunk, result in zip(chunks, results):
+            ids = [conv['id'] for conv in chunk]
+            if isinstance(result, dict):
+                logger.error(f"Error processing conversations {ids}: {result['output']}")
+                failed += len(chunk)
+            else:
+                done.append(ids)
+        
+        # Mark as processed
+        marked = await asyncio.gather(
+            *(self._mark_processed_batch(ids) for ids in done),
+            return_exceptions=True,
+        )
+        for ids, error in zip(done, marked):
+            if isinstance(error, BaseException):
+                logger.error(f"Error marking conversations {ids} processed: {error}")
+                failed += len(ids)
+        return failed
+    
+    @staticmethod
+    def _build_extraction_prompt(convs: list[dict]) -> str:
+        """Build the knowledge extraction prompt for one or more conversations."""
+        if len(convs) == 1:
+            return EXTRACTION_PROMPT.format(text=convs[0]['text'])
+        return EXTRACTION_BATCH_PROMPT.format(
+            count=len(convs),
+            conversations="\n\n".join(
+                f"[{i}] {conv['text']}" for i, conv in enumerate(convs)
+            ),
+        )
+    
+    def notify_new_chats(self):
+        """Wake the run loop because new chats are available.
+
+        Call this from your chat DB's notification callback, e.g.
+        ``await conn.add_listener("chats_new", lambda *_: agent.notify_new_chats())``.
+        """
+        self._new_chats.set()
+    
+    async def _wait_for_chats(self):
+        """Block until new chats are announced or poll_interval elapses."""
+        try:
+            await asyncio.wait_for(self._new_chats.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+    
     async def _get_unprocessed_chats(self):
         """Get conversations that haven't been processed."""
         # TODO: Query your chat DB
@@ -69,6 +170,14 @@ Then update the knowledge graph using the Neo4j tools."""
         # TODO: Update your DB
         pass
     
+    async def _mark_processed_batch(self, conv_ids: list[str]):
+        """Mark several conversations as processed.
+
+        Override with a single `UPDATE ... WHERE id IN (...)` for your DB.
+        """
+        for conv_id in conv_ids:
+            await self._mark_processed(conv_id)
+    
     async def cleanup(self):
         """Cleanup before shutdown."""
         logger.info("Memory master shutting down")
@@ -1,7 +1,11 @@
 """RAG-enabled chat agent with Neo4j knowledge graph."""
 
+import hashlib
+import time
+from collections import OrderedDict
 from core.agent_base import BaseAgent
 from loguru import logger
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter
 
 
 class RAGChatAgent(BaseAgent):
@@ -9,7 +13,21 @@ class RAGChatAgent(BaseAgent):
     
     Chat agent with access to company knowledge base.
     Perfect for: Customer support, internal Q&A, knowledge retrieval
+
+    Completed answers are cached per normalized query and conversation
+    history for CACHE_TTL seconds and replayed without touching the LLM or
+    Neo4j; a replayed turn is still added to message_history. The cache is
+    shared by all instances; call invalidate_cache() when the knowledge
+    graph changes.
     """
+
+    CACHE_MAX_SIZE = 1024
+    CACHE_TTL = 600.0  # seconds
+
+    # key -> (expires_at, events, the turn's messages)
+    _cache: "OrderedDict[str, tuple[float, list[dict], list[ModelMessage]]]" = (
+        OrderedDict()
+    )
     
     def __init__(self):
         super().__init__(
@@ -19,11 +37,82 @@ Always cite your sources and be accurate.""",
             mcp_config_path="mcp_neo4j.json"  # Neo4j memory tools
         )
     
-    async def run(self, query: str):
-        """Run RAG chat query with streaming."""
+    def run(self, query: str, no_cache: bool = False):
+        """Run RAG chat query with streaming.
+
+        Returns an async generator of stream events; iterate it with `async for`.
+        Pass no_cache=True to bypass the cache and refresh the stored answer.
+        """
         logger.info(f"RAG chat query: {query}")
         
+        key = self._cache_key(query, self.message_history)
+        if not no_cache:
+            cached = self._cache_get(key)
+            if cached is not None:
+                logger.debug("RAG cache hit")
+                events, messages = cached
+                return self._replay(events, messages)
+        
         # Stream response with RAG
+        # The agent will automatically use Neo4j tools for retrieval
+        return self._stream_and_cache(key, query)
+    
+    @classmethod
+    def invalidate_cache(cls):
+        """Drop all cached answers (e.g. after MemoryMasterAgent updates the graph)."""
+        cls._cache.clear()
+    
+    @staticmethod
+    def _cache_key(query: str, history: list) -> str:
+        """Hash the normalized query text together with the history it follows.
+
+        A follow-up like "and the second one?" means something different in
+        every conversation, so the answer is only reused for the same history.
+        """
+        h = hashlib.blake2b(query.strip().lower().encode("utf-8"))
+        if history:
+            h.update(b"\0")
+            h.update(ModelMessagesTypeAdapter.dump_json(history))
+        return h.hexdigest()
+    
+    @classmethod
+    def _cache_get(cls, key: str):
+        """Return (events, messages) for key, or None if missing or expired."""
+        entry = cls._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, events, messages = entry
+        if expires_at < time.monotonic():
+            del cls._cache[key]
+            return None
+        cls._cache.move_to_end(key)
+        return events, messages
+    
+    @classmethod
+    def _cache_put(cls, key: str, events: list, messages: list):
+        """Store a turn for key, evicting the least recently used entry if full."""
+        cls._cache[key] = (time.monotonic() + cls.CACHE_TTL, events, messages)
+        cls._cache.move_to_end(key)
+        while len(cls._cache) > cls.CACHE_MAX_SIZE:
+            cls._cache.popitem(last=False)
+    
+    async def _replay(self, events: list, messages: list):
+        """Record the cached turn in message_history, then yield its events.
+
+        The stored messages are reused as-is, so a follow-up question sees
+        the same history (and cache key) as after the original answer.
+        """
+        self._append_messages(messages)
+        for event in events:
+            yield event
+    
+    async def _stream_and_cache(self, key: str, query: str):
+        """Stream a fresh answer, caching it once it completes without errors."""
+        events = []
         async for event in self.run_query_stream(query):
-            # The agent will automatically use Neo4j tools for retrieval
+            events.append(event)
             yield event
+        
+        if events and events[-1].get("type") == "final":
+            # run_query_stream() records the completed turn last
+            self._cache_put(key, events, list(self._history_turns[-1]))
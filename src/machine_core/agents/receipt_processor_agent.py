@@ -1,6 +1,9 @@
 """Receipt processor agent with vision model."""
 
+import asyncio
+from typing import Optional
 from core.agent_base import BaseAgent
+from core.file_processor import FileProcessor
 from loguru import logger
 
 
@@ -9,11 +12,31 @@ class ReceiptProcessorAgent(BaseAgent):
     
     Processes receipts infinitely from a queue, extracts data, updates DB.
     Perfect for: Queue processing, document analysis, data extraction
+
+    Receipts are pulled from the queue in batches of ``batch_size`` and sent to
+    the model concurrently, so a backend that batches requests (e.g. Ollama with
+    ``OLLAMA_NUM_PARALLEL``, vLLM with ``--max-num-seqs``) can serve them in one
+    forward pass. Keep ``batch_size`` at or below the server's parallelism.
+
+    Extracted results are handed to a background writer through a bounded
+    queue, so DB writes overlap with inference on the next batch.
+
+    Receipt extraction tolerates reduced precision well, so model_name can
+    point at a quantized build served by the backend (e.g. an Ollama
+    ``q8_0``/``q4_K_M`` tag or a vLLM AWQ/GPTQ checkpoint) to roughly halve
+    weight bandwidth and VRAM.
     """
+
+    WRITE_QUEUE_SIZE = 256
+    WRITE_BATCH_SIZE = 64
+
+    # Sent before the image on every call, so together with the system prompt
+    # it forms an identical prefix the backend's prompt cache can reuse.
+    EXTRACT_PROMPT = "Extract all information from this receipt"
     
-    def __init__(self):
+    def __init__(self, batch_size: int = 8, model_name: Optional[str] = None):
         super().__init__(
-            model_name="qwen-vl",  # Vision model for receipt reading
+            model_name=model_name or "qwen-vl",  # Vision model for receipt reading
             system_prompt="""You are a receipt analyzer. Extract:
 - Store name
 - Date
@@ -23,45 +46,152 @@ class ReceiptProcessorAgent(BaseAgent):
 Return structured JSON.""",
             mcp_config_path="mcp_receipt.json"  # Includes DB tools
         )
+        self.batch_size = batch_size
         self.db_queue_empty = False
+        self._write_q: asyncio.Queue | None = None
+        self._writer: asyncio.Task | None = None
     
     async def run(self):
         """Process receipts from queue until empty."""
         logger.info("Receipt processor started")
+        self._start_writer()
+        
+        # (batch, image prefetch task) queued up during the previous iteration
+        pending = None
         
         while not self.db_queue_empty:
             try:
-                # Get next receipt from queue (pseudo-code)
-                receipt_path = await self._get_next_receipt()
+                if pending is None:
+                    # Drain up to batch_size receipts from the queue
+                    batch = await self._get_next_receipts(self.batch_size)
+                    images_task = self._prefetch_images(batch)
+                else:
+                    batch, images_task = pending
+                    pending = None
                 
-                if not receipt_path:
+                if not batch:
                     self.db_queue_empty = True
                     break
                 
-                logger.info(f"Processing receipt: {receipt_path}")
+                images = await images_task
                 
-                # Process with vision
-                result = await self.run_query(
-                    "Extract all information from this receipt",
-                    image_paths=receipt_path
+                # Start loading the next batch so its image I/O overlaps inference
+                next_batch = await self._get_next_receipts(self.batch_size)
+                pending = (next_batch, self._prefetch_images(next_batch))
+                
+                logger.info(f"Processing batch of {len(batch)} receipt(s)")
+                
+                # Process with vision, all receipts in the batch concurrently.
+                # run_query_batch resets the MCP toolsets once for the batch and
+                # gives every receipt its own empty history.
+                results = await self.run_query_batch(
+                    [self.EXTRACT_PROMPT] * len(images),
+                    max_concurrency=self.batch_size,
+                    image_paths=images,
                 )
                 
-                # Save to DB (pseudo-code)
-                await self._save_to_db(result)
+                for receipt_path, result in zip(batch, results):
+                    if isinstance(result, dict):
+                        logger.error(
+                            f"Error processing receipt {receipt_path}: {result['output']}"
+                        )
+                    else:
+                        # Hand off to the background writer (blocks only if it falls behind)
+                        await self._write_q.put(result)
                 
             except Exception as e:
-                logger.error(f"Error processing receipt: {e}")
-                # Continue to next receipt
+                logger.error(f"Error processing receipts: {e}")
+                # Continue to next batch
                 continue
         
+        # Make sure everything extracted is persisted before reporting done
+        await self._write_q.join()
         logger.info("Receipt processor finished")
     
+    async def _get_next_receipts(self, n: int) -> list:
+        """Get up to ``n`` receipts from the queue.
+
+        Returns fewer than ``n`` paths (possibly none) once the queue runs dry.
+        """
+        batch = []
+        while len(batch) < n:
+            receipt_path = await self._get_next_receipt()
+            if not receipt_path:
+                break
+            batch.append(receipt_path)
+        return batch
+    
+    def _prefetch_images(self, receipt_paths: list) -> asyncio.Task:
+        """Start loading receipt images into data URLs in the background.
+
+        The task resolves to one entry per receipt: its data URL, or the
+        original path if loading failed (run_query then reports the error).
+        Every receipt is new, so this skips the agent's image cache rather
+        than filling it with data URLs that are never looked up again.
+        """
+        async def load():
+            http_client = self._http_client()
+            loaded = await asyncio.gather(
+                *(
+                    FileProcessor.prepare_for_vlm(path, http_client)
+                    for path in receipt_paths
+                ),
+                return_exceptions=True,
+            )
+            return [
+                path if isinstance(image, BaseException) or not image else image
+                for path, image in zip(receipt_paths, loaded)
+            ]
+        
+        return asyncio.create_task(load())
+    
     async def _get_next_receipt(self):
         """Get next receipt from queue (implement with your DB)."""
         # TODO: Implement your queue logic
         pass
     
+    def _start_writer(self):
+        """Start the background DB writer on the running event loop."""
+        if self._writer is None or self._writer.done():
+            self._write_q = asyncio.Queue(maxsize=self.WRITE_QUEUE_SIZE)
+            self._writer = asyncio.create_task(self._drain_writes())
+    
+    async def _drain_writes(self):
+        """Persist queued results in batches of up to WRITE_BATCH_SIZE."""
+        while True:
+            batch = [await self._write_q.get()]
+            while not self._write_q.empty() and len(batch) < self.WRITE_BATCH_SIZE:
+                batch.append(self._write_q.get_nowait())
+            try:
+                await self._save_batch_to_db(batch)
+            except Exception as e:
+                logger.error(f"Error saving {len(batch)} receipt(s): {e}")
+            finally:
+                for _ in batch:
+                    self._write_q.task_done()
+    
+    async def _save_batch_to_db(self, results: list):
+        """Save a batch of extracted results.
+
+        Defaults to one _save_to_db() per result; override with a bulk insert.
+        """
+        saved = await asyncio.gather(
+            *(self._save_to_db(result) for result in results),
+            return_exceptions=True,
+        )
+        for error in saved:
+            if isinstance(error, BaseException):
+                logger.error(f"Error saving receipt: {error}")
+    
     async def _save_to_db(self, result):
         """Save extracted data to database."""
         # TODO: Implement your DB logic
         pass
+    
+    async def cleanup(self):
+        """Flush pending DB writes and stop the writer."""
+        if self._writer is not None:
+            await self._write_q.join()
+            self._writer.cancel()
+            self._writer = None
+        await super().cleanup()
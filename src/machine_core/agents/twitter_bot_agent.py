@@ -1,7 +1,13 @@
 """Twitter bot agent for scheduled posting."""
 
 import asyncio
+import contextlib
+import json
 import random
+import time
+from datetime import date
+from pathlib import Path
+from typing import Optional
 from core.agent_base import BaseAgent
 from loguru import logger
 
@@ -11,9 +17,14 @@ class TwitterBotAgent(BaseAgent):
     
     Runs on schedule, analyzes knowledge graph, generates tweets.
     Perfect for: Social media bots, scheduled content, trend analysis
+
+    Each tweet runs in its own task scheduled with loop.call_later(), so
+    trends, results and LLM state are freed while the bot idles between
+    tweets. The daily tweet count and next allowed post time are persisted
+    to state_path so a restarted process picks up where it left off.
     """
     
-    def __init__(self):
+    def __init__(self, state_path: str = "twitter_bot_state.json"):
         super().__init__(
             model_name="gpt-4",
             system_prompt="""You are a social media content creator.
@@ -22,10 +33,20 @@ Keep tweets under 280 characters, use relevant hashtags.""",
             mcp_config_path="mcp_twitter.json"  # Twitter + Neo4j tools
         )
         self.daily_tweet_limit = 5
+        self.state_path = Path(state_path)
         self.tweets_today = 0
+        self.next_allowed_ts = 0.0
+        self._load_state()
+        self._done: Optional[asyncio.Future] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._task: Optional[asyncio.Task] = None
     
     async def run(self):
-        """Generate and post daily tweets."""
+        """Generate and post daily tweets.
+
+        Schedules the first tweet and waits until the daily limit is reached
+        (or posting fails); each tweet is its own short-lived task.
+        """
         logger.info("Twitter bot started")
         
         # Check if already posted today
@@ -33,35 +54,123 @@ Keep tweets under 280 characters, use relevant hashtags.""",
             logger.info("Already posted today, skipping")
             return
         
-        while self.tweets_today < self.daily_tweet_limit:
-            try:
-                # Get trending topics from knowledge graph
-                trends = await self._get_trends()
-                
-                # Generate tweet
-                result = await self.run_query(
-                    f"Create a tweet about these trends: {trends}"
-                )
-                
-                tweet_text = result.output if isinstance(result, dict) else result.output
-                
-                # Post to Twitter (handled by MCP tool)
-                logger.info(f"Posting tweet: {tweet_text}")
-                self.tweets_today += 1
-                
-                # Random delay between tweets
-                await asyncio.sleep(random.randint(3600, 7200))  # 1-2 hours
-                
-            except Exception as e:
-                logger.error(f"Error creating tweet: {e}")
-                break
+        self._done = asyncio.get_running_loop().create_future()
+        self._schedule_next(max(0.0, self.next_allowed_ts - time.time()))
+        await self._done
         
         logger.info(f"Twitter bot finished ({self.tweets_today} tweets posted)")
     
+    async def generate_and_post_once(self):
+        """Generate and post a single tweet, then persist the daily count."""
+        # Get trending topics from knowledge graph
+        trends = await self._get_trends()
+        
+        # Generate tweet
+        result = await self.run_query(
+            f"Create a tweet about these trends: {trends}"
+        )
+        
+        if isinstance(result, dict):
+            # run_query reports failures as {"output": "Error: ..."}; never tweet those
+            raise RuntimeError(result["output"])
+        tweet_text = result.output
+        
+        # Post to Twitter (handled by MCP tool)
+        logger.info(f"Posting tweet: {tweet_text}")
+        self.tweets_today += 1
+        self._save_state()
+    
+    def _schedule_next(self, delay: float):
+        """Run _post_one_tweet() in a fresh task after `delay` seconds."""
+        loop = asyncio.get_running_loop()
+        self._timer = loop.call_later(
+            delay, lambda: setattr(self, "_task", loop.create_task(self._post_one_tweet()))
+        )
+    
+    async def _post_one_tweet(self):
+        """Post one tweet and schedule the next, or finish the run."""
+        try:
+            await self.generate_and_post_once()
+        except Exception as e:
+            logger.error(f"Error creating tweet: {e}")
+            self._finish()
+            return
+        
+        if self.tweets_today >= self.daily_tweet_limit:
+            self._finish()
+            return
+        
+        # Release per-tweet state before the long idle period
+        self._release_tweet_state()
+        
+        # Random delay between tweets
+        delay = random.randint(3600, 7200)  # 1-2 hours
+        self.next_allowed_ts = time.time() + delay
+        self._save_state()
+        self._schedule_next(delay)
+    
+    def _finish(self):
+        """Resolve the future run() is waiting on."""
+        if self._done is not None and not self._done.done():
+            self._done.set_result(None)
+    
+    def _release_tweet_state(self):
+        """Drop conversation state between tweets.
+
+        MCP transports are opened per run by pydantic-ai, so only the
+        accumulated message history needs releasing here.
+        """
+        self.message_history = []
+    
+    async def cleanup(self):
+        """Cancel any scheduled or in-flight tweet before shutdown."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        task, self._task = self._task, None
+        if task is not None and not task.done() and task is not asyncio.current_task():
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._finish()
+        await super().cleanup()
+    
     async def _already_posted_today(self):
         """Check if we already posted today."""
-        # TODO: Check your DB/log
-        return False
+        return self.tweets_today >= self.daily_tweet_limit
+    
+    def _load_state(self):
+        """Load today's tweet count and next post time from state_path."""
+        try:
+            state = json.loads(self.state_path.read_text())
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Could not read {self.state_path}: {e}")
+            return
+        if state.get("date") != date.today().isoformat():
+            return
+        self.tweets_today = int(state.get("tweets_today", 0))
+        self.next_allowed_ts = float(state.get("next_allowed_ts", 0.0))
+    
+    def _save_state(self):
+        """Persist today's tweet count and next post time to state_path.
+
+        A failed write is logged, not raised: it runs between tweets, and an
+        exception there would end the call_later chain and leave run() waiting.
+        """
+        try:
+            self.state_path.write_text(
+                json.dumps(
+                    {
+                        "date": date.today().isoformat(),
+                        "tweets_today": self.tweets_today,
+                        "next_allowed_ts": self.next_allowed_ts,
+                    }
+                )
+            )
+        except Exception as e:
+            logger.warning(f"Could not write {self.state_path}: {e}")
     
     async def _get_trends(self):
         """Get trending topics from Neo4j knowledge graph."""
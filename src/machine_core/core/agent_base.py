@@ -6,12 +6,185 @@ This module defines:
 """
 
 from __future__ import annotations
+import asyncio
+import hashlib
+import importlib.util
+import random
+import time
+import traceback
 from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Optional, Union, Any
-from pydantic_ai import ImageUrl, AgentRunResult
+import httpx
+from pydantic_core import to_json, to_jsonable_python
+from pydantic_ai import (
+    Agent,
+    ImageUrl,
+    AgentRunResult,
+    AgentRunResultEvent,
+    FunctionToolCallEvent,
+    FunctionToolResultEvent,
+    FinalResultEvent,
+)
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+    ThinkingPartDelta,
+    TextPartDelta,
+    PartStartEvent,
+    PartDeltaEvent,
+    PartEndEvent,
+    UserPromptPart,
+)
+from pydantic_ai.mcp import MCPServerSSE, MCPServerStreamableHTTP, MCPServerStdio
 from loguru import logger
-from .agent_core import AgentCore
+from .agent_core import _MCP_POOL, AgentCore
+from .config import get_history_summary_prompt
+from .file_processor import FileProcessor
+from .mcp_setup import close_http_clients
+from .result_cache import CachedRunResult, get_result_cache
+
+
+# httpx only speaks HTTP/2 when the optional h2 package is installed
+_HTTP2 = importlib.util.find_spec("h2") is not None
+
+try:
+    import orjson
+
+    _dumps = orjson.dumps
+except ImportError:
+    _dumps = to_json
+
+_JSON_SCALARS = (str, int, float, bool, type(None))
+
+# server_id for get_server_info(), by exact MCP server class
+_SERVER_ID_FN = {
+    MCPServerStdio: lambda t: f"{t.command} {' '.join(t.args) if t.args else ''}",
+    MCPServerSSE: lambda t: t.url,
+    MCPServerStreamableHTTP: lambda t: t.url,
+}
+
+
+def _to_jsonable(value: Any) -> Any:
+    """Convert tool args/results to plain JSON-compatible Python values.
+
+    Done once when the event is built, so consumers serializing every
+    stream event never walk a pydantic model or dataclass themselves.
+    """
+    if type(value) in _JSON_SCALARS:
+        return value
+    return to_jsonable_python(value, fallback=str)
+
+
+def _is_recoverable_error(error: Exception) -> bool:
+    """Whether a failed model call is worth retrying after a backoff.
+
+    Timeouts, rate limits and 5xx responses are transient; auth errors,
+    bad requests and schema problems will fail the same way again.
+    """
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status in (408, 409, 429) or status >= 500
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    error_str = str(error).lower()
+    return any(
+        indicator in error_str
+        for indicator in [
+            "timed out",
+            "timeout",
+            "rate limit",
+            "overloaded",
+            "temporarily unavailable",
+        ]
+    )
+
+
+def _backoff_delay(
+    attempt: int, base_delay: float, max_delay: float, jitter: float = 0.5
+) -> float:
+    """Capped exponential backoff with multiplicative jitter."""
+    return min(max_delay, base_delay * 2**attempt) * (1 + random.uniform(0, jitter))
+
+
+def _render_transcript(messages: list[ModelMessage]) -> str:
+    """Flatten messages into plain text for the summarizer.
+
+    Sending the messages as history would replay tool calls to a model
+    that doesn't have those tools, which some providers reject.
+    """
+    lines = []
+    for msg in messages:
+        for part in msg.parts:
+            kind = part.part_kind
+            if kind == "user-prompt":
+                content = part.content
+                if not isinstance(content, str):
+                    content = " ".join(c for c in content if isinstance(c, str))
+                lines.append(f"User: {content}")
+            elif kind == "text":
+                lines.append(f"Assistant: {part.content}")
+            elif kind == "tool-call":
+                lines.append(f"Tool call {part.tool_name}: {part.args}")
+            elif kind == "tool-return":
+                lines.append(f"Tool result {part.tool_name}: {part.content}")
+    return "\n".join(lines)
+
+
+@dataclass
+class _StreamState:
+    """Accumulated output of a single run_query_stream() call.
+
+    Chunks are collected in lists and joined once at the end; repeated
+    str += would copy the whole reply on every token.
+    """
+
+    text_only: bool = False
+    coalesce_s: float = 0.0
+    text_parts: list[str] = field(default_factory=list)
+    thinking_parts: list[str] = field(default_factory=list)
+    pending: list[str] = field(default_factory=list)
+    last_flush: float = float("-inf")
+
+    @property
+    def text(self) -> str:
+        return "".join(self.text_parts)
+
+    @property
+    def thinking(self) -> Optional[str]:
+        return "".join(self.thinking_parts) or None
+
+    def emit(self, out: dict) -> tuple[dict, ...]:
+        """Events to yield for out, merging text deltas within coalesce_s.
+
+        The first delta goes out immediately; later ones are buffered until
+        coalesce_s has passed or a non-text event needs to go out.
+        """
+        if not self.coalesce_s:
+            return (out,)
+        if out["type"] == "text_delta":
+            self.pending.append(out["content"])
+            now = time.monotonic()
+            if now - self.last_flush < self.coalesce_s:
+                return ()
+            self.last_flush = now
+            return (self._take_pending(),)
+        if self.pending:
+            return (self._take_pending(), out)
+        return (out,)
+
+    def flush(self) -> Optional[dict]:
+        """Buffered text as a single delta, or None if nothing is pending."""
+        return self._take_pending() if self.pending else None
+
+    def _take_pending(self) -> dict:
+        event = {"type": "text_delta", "content": "".join(self.pending)}
+        self.pending.clear()
+        return event
 
 
 class BaseAgent(AgentCore, ABC):
@@ -33,6 +206,8 @@ class BaseAgent(AgentCore, ABC):
                 return result
     """
 
+    # Number of processed images (ImageUrl parts) kept per agent
+    IMAGE_CACHE_SIZE = 64
     @abstractmethod
     async def run(self, *args, **kwargs):
         """Main execution loop for the agent.
@@ -46,8 +221,19 @@ class BaseAgent(AgentCore, ABC):
         """Cleanup resources before shutdown.
 
         Override if your agent needs to clean up resources (close connections, save state, etc.)
+        and call super().cleanup() so shared MCP toolsets are released.
         """
-        pass
+        self._release_mcp_pool()
+        if not _MCP_POOL:
+            # Last pooled toolsets released: drop this loop's shared MCP client
+            await close_http_clients()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        if self._history_store is not None:
+            # Waits for queued turns to be written
+            await asyncio.to_thread(self._history_store.close)
+            self._history_store = None
 
     # ========================================================================
     # Execution Patterns - Use these in your run() method
@@ -60,9 +246,14 @@ class BaseAgent(AgentCore, ABC):
         the event loop that was active when the lock was created.  Callers like
         Streamlit create a fresh event loop for every request; without resetting,
         the old lock is invalid and causes 'Session terminated' errors.
+
+        Toolsets may be pooled across agents, so servers that are currently
+        running (entered by another agent) are left alone.
         """
         for ts in self.toolsets:
             inner = getattr(ts, "wrapped_toolset", ts)
+            if getattr(inner, "is_running", False):
+                continue
             if hasattr(inner, "__post_init__"):
                 inner.__post_init__()
 
@@ -75,10 +266,14 @@ class BaseAgent(AgentCore, ABC):
         if not self.toolsets:
             return False
 
-        # Try to identify which server(s) failed by probing each one
+        # Try to identify which server(s) failed by probing each one.
+        # Toolsets may be pooled across agents: a server that is running is
+        # live in another agent, so it is neither reset nor probed.
         bad_toolsets = []
         for ts in self.toolsets:
             inner = getattr(ts, "wrapped_toolset", ts)
+            if getattr(inner, "is_running", False):
+                continue
             if hasattr(inner, "__post_init__"):
                 inner.__post_init__()
             try:
@@ -107,11 +302,158 @@ class BaseAgent(AgentCore, ABC):
         self._reset_toolset_state()
         return True
 
+    async def _compact_if_needed(self):
+        """Summarize the oldest half of history once it nears the context window.
+
+        Triggers when the estimated history size exceeds
+        context_window * agent_config.history_compaction_ratio. The oldest
+        half of the turns is replaced by a single summary turn written by
+        agent_config.summary_model_name (or the main model). On failure the
+        history is left as is.
+        """
+        ratio = self.agent_config.history_compaction_ratio
+        if not ratio or not self.context_window or len(self._history_turns) < 2:
+            return
+
+        budget = int(self.context_window * ratio)
+        tokens = self.history_tokens
+        if tokens <= budget:
+            return
+
+        turns = list(self._history_turns)
+        half = len(turns) // 2
+        old = [msg for turn in turns[:half] for msg in turn]
+        logger.info(
+            f"History ~{tokens} tokens exceeds budget {budget}, "
+            f"summarizing {half} of {len(turns)} turn(s)"
+        )
+        try:
+            summarizer = Agent(self._summary_model())
+            result = await summarizer.run(
+                f"{get_history_summary_prompt()}\n\n{_render_transcript(old)}"
+            )
+        except Exception as e:
+            logger.warning(f"History compaction failed, keeping full history: {e}")
+            return
+
+        request_parts = [UserPromptPart("Summarize our conversation so far.")]
+        if self.system_prompt:
+            request_parts.insert(0, SystemPromptPart(self.system_prompt))
+        summary_turn = [
+            ModelRequest(parts=request_parts),
+            ModelResponse(parts=[TextPart(result.output)]),
+        ]
+        self.message_history = [
+            *summary_turn,
+            *(msg for turn in turns[half:] for msg in turn),
+        ]
+
+    def _result_cache_key(self, query: str, images: list[ImageUrl]) -> str:
+        """Result cache key: system prompt, model, query and images.
+
+        Conversation history is deliberately left out, so the same question
+        is answered once no matter what was asked before it.
+        """
+        h = hashlib.blake2b(digest_size=16)
+        for value in (self.system_prompt, getattr(self.model, "model_name", ""), query):
+            h.update(value.encode("utf-8"))
+            h.update(b"\0")
+        for image in images:
+            h.update(hashlib.sha256(image.url.encode("utf-8")).digest())
+        return h.hexdigest()
+
+    async def _cached_result(
+        self, query: str, images: list[ImageUrl]
+    ) -> tuple[Optional[str], Optional[CachedRunResult]]:
+        """Look up (key, cached answer) when agent_config.enable_result_cache is on.
+
+        Returns (None, None) when the cache is off. The cache lives in the
+        history database, so other processes' answers count as hits too.
+        """
+        if not self.agent_config.enable_result_cache:
+            return None, None
+        key = self._result_cache_key(query, images)
+        cache = get_result_cache(self.agent_config.history_db_path)
+        return key, await asyncio.to_thread(cache.get, key)
+
+    async def _store_result(self, key: Optional[str], output, messages: list):
+        """Cache an answer unless the run called tools (tool results may change)."""
+        if key is None or not isinstance(output, str):
+            return
+        if any(
+            part.part_kind == "tool-call"
+            for msg in messages
+            if isinstance(msg, ModelResponse)
+            for part in msg.parts
+        ):
+            return
+        cache = get_result_cache(self.agent_config.history_db_path)
+        try:
+            await asyncio.to_thread(cache.put, key, output, messages)
+        except Exception as e:
+            logger.warning(f"Could not cache result: {e}")
+
+    def _stream_model_settings(self) -> Optional[dict]:
+        """Per-request model settings for streaming runs.
+
+        When agent_config.draft_model_name is set, asks an OpenAI-compatible
+        self-hosted backend (vLLM, llama.cpp server) to use it as the draft
+        model for speculative decoding. Leave unset for hosted providers,
+        which reject unknown request fields.
+        """
+        if self.agent_config.draft_model_name:
+            return {
+                "extra_body": {"speculative_model": self.agent_config.draft_model_name}
+            }
+        return None
+
+    async def _run_with_backoff(
+        self,
+        message_content,
+        message_history: Optional[list] = None,
+        reset_toolsets: bool = True,
+    ):
+        """Run the agent, retrying transient provider failures.
+
+        Timeouts, rate limits and 5xx responses are retried up to
+        agent_config.query_retries times with capped exponential backoff and
+        jitter. Other errors, and the final failure, are raised immediately.
+
+        Args:
+            message_content: User prompt (text or text + images)
+            message_history: History to send; defaults to self.message_history
+            reset_toolsets: Reset MCP toolset state before each attempt. Pass
+                False when several runs share the toolsets concurrently.
+        """
+        if message_history is None:
+            message_history = self.message_history
+        max_attempts = self.agent_config.query_retries + 1
+        for attempt in range(max_attempts):
+            try:
+                if reset_toolsets:
+                    self._reset_toolset_state()
+                return await self.agent.run(
+                    message_content, message_history=message_history
+                )
+            except Exception as e:
+                if attempt == max_attempts - 1 or not _is_recoverable_error(e):
+                    raise
+                delay = _backoff_delay(
+                    attempt,
+                    self.agent_config.retry_base_delay,
+                    self.agent_config.retry_max_delay,
+                )
+                logger.warning(
+                    f"Recoverable error (attempt {attempt + 1}/{max_attempts}), "
+                    f"retrying in {delay:.1f}s: {e}"
+                )
+                await asyncio.sleep(delay)
+
     async def run_query(
         self,
         query: str,
         image_paths: Optional[Union[str, Path, list[Union[str, Path]]]] = None,
-    ) -> Union[dict, AgentRunResult]:
+    ) -> Union[dict, AgentRunResult, CachedRunResult]:
         """Execute a single query with retry logic.
 
         Use this for:
@@ -121,56 +463,49 @@ class BaseAgent(AgentCore, ABC):
         - Non-streaming contexts
 
         Returns:
-            AgentRunResult or dict with agent result
+            AgentRunResult or dict with agent result (a CachedRunResult on a
+            result cache hit, see agent_config.enable_result_cache)
         """
-        from .config import Config
-
-        agent_config = Config.Agent()
-
         try:
             if not query:
                 logger.error("No query provided.")
                 return {"output": "Error: No query provided."}
 
-            # Process images if provided
-            processed_images = []
-            if image_paths:
-                if not isinstance(image_paths, list):
-                    image_paths = [image_paths]
+            await self.aready()
+            await self._compact_if_needed()
 
-                for img_path in image_paths:
-                    try:
-                        data_url = await self._process_image(img_path)
-                        if data_url:
-                            processed_images.append(data_url)
-                    except Exception as e:
-                        logger.error(f"Failed to process image {img_path}: {e}")
-                        return {
-                            "output": f"Error: Failed to process image {img_path}: {e}"
-                        }
+            # Process images if provided
+            processed_images, image_error = await self._process_images(image_paths)
+            if image_error:
+                return {"output": image_error}
 
             logger.info(f"Processed {len(processed_images)} image(s)")
 
             # Build message content
             if processed_images:
-                message_content = [query] + [
-                    ImageUrl(url=img) for img in processed_images
-                ]
+                message_content = [query, *processed_images]
             else:
                 message_content = query
 
+            cache_key, cached = await self._cached_result(query, processed_images)
+            if cached is not None:
+                logger.info("Result cache hit, skipping model call")
+                self.usage = cached.usage()
+                self._append_messages(cached.new_messages())
+                return cached
+
             # Execute with pydantic-ai's internal error handling
             # pydantic-ai has its own retry logic for tool calls, configured via the 'retries' parameter
             # We should let it handle tool errors and pass them to the LLM for adjustment
             # Only catch critical errors that prevent execution entirely
             try:
-                self._reset_toolset_state()
-                result = await self.agent.run(
-                    message_content, message_history=self.message_history
-                )
+                result = await self._run_with_backoff(message_content)
                 if result:
                     self.usage = result.usage()
-                    self.message_history = result.all_messages()
+                    self._append_messages(result.new_messages())
+                    await self._store_result(
+                        cache_key, result.output, result.new_messages()
+                    )
                     return result
                 else:
                     logger.warning("Empty result from agent execution")
@@ -195,7 +530,7 @@ class BaseAgent(AgentCore, ABC):
                         )
                         if result:
                             self.usage = result.usage()
-                            self.message_history = result.all_messages()
+                            self._append_messages(result.new_messages())
                             return result
                     except Exception as retry_err:
                         logger.error(f"Retry also failed: {retry_err}")
@@ -209,10 +544,80 @@ class BaseAgent(AgentCore, ABC):
             logger.error(error_msg)
             return {"output": error_msg}
 
+    async def run_query_batch(
+        self,
+        queries: list[str],
+        max_concurrency: int = 16,
+        image_paths: Optional[
+            list[Optional[Union[str, Path, list[Union[str, Path]]]]]
+        ] = None,
+    ) -> list[Union[dict, AgentRunResult]]:
+        """Execute independent queries concurrently.
+
+        Use this for:
+        - Bulk CLI/cron jobs
+        - Classifying or extracting over many inputs
+
+        Each query runs with an empty message history, and
+        self.message_history is left untouched. self.usage is set to the
+        combined usage of the batch.
+
+        Args:
+            queries: Prompts to run
+            max_concurrency: Maximum number of in-flight model calls
+            image_paths: Optional images per query, aligned with queries
+                (each entry is None, one image, or a list of images)
+
+        Returns:
+            One entry per query, in order: AgentRunResult, or
+            {"output": "Error: ..."} for queries that failed
+        """
+        sem = asyncio.Semaphore(max_concurrency)
+        if image_paths is None:
+            image_paths = [None] * len(queries)
+
+        async def _run_one(query: str, images):
+            if not query:
+                return {"output": "Error: No query provided."}
+            processed_images, image_error = await self._process_images(images)
+            if image_error:
+                return {"output": image_error}
+            message_content = (
+                [query, *processed_images] if processed_images else query
+            )
+            async with sem:
+                try:
+                    result = await self._run_with_backoff(
+                        message_content, message_history=[], reset_toolsets=False
+                    )
+                except Exception as e:
+                    logger.error(f"Batch query failed: {e}")
+                    return {"output": f"Error: {str(e)}"}
+            return result or {"output": "Error: Agent returned empty result."}
+
+        await self.aready()
+        # Reset once up front; resetting inside concurrent runs could clobber
+        # a server another run is entering.
+        self._reset_toolset_state()
+        results = await asyncio.gather(
+            *(_run_one(q, images) for q, images in zip(queries, image_paths))
+        )
+
+        usage = None
+        for result in results:
+            if isinstance(result, dict):
+                continue
+            usage = result.usage() if usage is None else usage + result.usage()
+        if usage is not None:
+            self.usage = usage
+
+        return list(results)
+
     async def run_query_stream(
         self,
         query: str,
         image_paths: Optional[Union[str, Path, list[Union[str, Path]]]] = None,
+        text_only: bool = False,
     ):
         """Execute a query with streaming support.
 
@@ -228,6 +633,14 @@ class BaseAgent(AgentCore, ABC):
                 - 'content': the actual content
                 - 'tool_name': (if type is tool_call/tool_result)
                 - 'tool_args': (if type is tool_call)
+                - 'usage': (if type is final) input_tokens, output_tokens, total_tokens
+
+        With text_only=True, thinking and tool events are not emitted; only
+        'text_delta', 'final' and 'error' events are yielded.
+
+        A transient provider failure (timeout, rate limit, 5xx) before the
+        first event is retried with the same backoff as run_query(); once
+        events have been yielded, errors are reported as an 'error' event.
         """
         try:
             if not query:
@@ -235,280 +648,176 @@ class BaseAgent(AgentCore, ABC):
                 yield {"type": "error", "content": "Error: No query provided."}
                 return
 
-            # Process images
-            processed_images = []
-            if image_paths:
-                if not isinstance(image_paths, list):
-                    image_paths = [image_paths]
+            await self.aready()
+            await self._compact_if_needed()
 
-                for img_path in image_paths:
-                    try:
-                        data_url = await self._process_image(img_path)
-                        if data_url:
-                            processed_images.append(data_url)
-                    except Exception as e:
-                        logger.error(f"Failed to process image {img_path}: {e}")
-                        yield {
-                            "type": "error",
-                            "content": f"Error: Failed to process image {img_path}: {e}",
-                        }
-                        return
+            # Process images
+            processed_images, image_error = await self._process_images(image_paths)
+            if image_error:
+                yield {"type": "error", "content": image_error}
+                return
 
             logger.info(f"Processed {len(processed_images)} image(s)")
 
             # Build message content
             if processed_images:
-                message_content = [query] + [
-                    ImageUrl(url=img) for img in processed_images
-                ]
+                message_content = [query, *processed_images]
             else:
                 message_content = query
 
             # Stream the response
-            full_text = ""
-            full_thinking = ""
-
-            try:
-                from pydantic_ai.messages import (
-                    ThinkingPartDelta,
-                    TextPartDelta,
-                    PartStartEvent,
-                    PartDeltaEvent,
-                    PartEndEvent,
-                )
-                from pydantic_ai import (
-                    AgentRunResultEvent,
-                    FunctionToolCallEvent,
-                    FunctionToolResultEvent,
-                    FinalResultEvent,
-                )
+            state = _StreamState(
+                text_only=text_only,
+                coalesce_s=self.agent_config.stream_coalesce_ms / 1000,
+            )
 
-                self._reset_toolset_state()
-                async for event in self.agent.run_stream_events(
-                    message_content, message_history=self.message_history
-                ):
-                    try:
-                        if isinstance(event, AgentRunResultEvent):
-                            self.usage = event.result.usage()
-                            self.message_history = event.result.all_messages()
+            max_attempts = self.agent_config.query_retries + 1
+            for attempt in range(max_attempts):
+                received = False
+                try:
+                    self._reset_toolset_state()
+                    async for event in self.agent.run_stream_events(
+                        message_content,
+                        message_history=self.message_history,
+                        model_settings=self._stream_model_settings(),
+                    ):
+                        received = True
+                        handler = self._STREAM_DISPATCH.get(type(event))
+                        if handler is None:
+                            logger.debug(
+                                f"Unhandled event type: {type(event).__name__}"
+                            )
+                            continue
+                        try:
+                            out = handler(self, event, state)
+                        except Exception as event_error:
+                            logger.error(
+                                f"Error processing event {type(event).__name__}: {event_error}",
+                                exc_info=True,
+                            )
                             continue
+                        if out is not None:
+                            for pending_event in state.emit(out):
+                                yield pending_event
+
+                    if (pending_event := state.flush()) is not None:
+                        yield pending_event
+
+                    # Send final message
+                    yield self._final_event(state)
+                    return
+
+                except Exception as stream_error:
+                    # Nothing has reached the caller yet, so a transient
+                    # provider failure can be retried like in run_query()
+                    if (
+                        not received
+                        and attempt < max_attempts - 1
+                        and _is_recoverable_error(stream_error)
+                    ):
+                        delay = _backoff_delay(
+                            attempt,
+                            self.agent_config.retry_base_delay,
+                            self.agent_config.retry_max_delay,
+                        )
+                        logger.warning(
+                            f"Recoverable stream error (attempt {attempt + 1}/"
+                            f"{max_attempts}), retrying in {delay:.1f}s: {stream_error}"
+                        )
+                        await asyncio.sleep(delay)
+                        continue
 
-                        if isinstance(event, PartDeltaEvent):
-                            if isinstance(event.delta, TextPartDelta):
-                                text_chunk = event.delta.content_delta
-                                if text_chunk:
-                                    full_text += text_chunk
-                                    yield {"type": "text_delta", "content": text_chunk}
-
-                            elif isinstance(event.delta, ThinkingPartDelta):
-                                thinking_chunk = event.delta.content_delta
-                                if thinking_chunk:
-                                    full_thinking += thinking_chunk
-                                    logger.debug(
-                                        f"Streaming thinking delta: {len(thinking_chunk)} chars"
-                                    )
-                                    yield {
-                                        "type": "thinking_delta",
-                                        "content": thinking_chunk,
-                                    }
-
-                        elif isinstance(event, FunctionToolCallEvent):
-                            logger.debug(f"Tool call: {event.part.tool_name}")
-                            yield {
-                                "type": "tool_call",
-                                "tool_name": event.part.tool_name,
-                                "tool_args": event.part.args,
-                            }
+                    if (pending_event := state.flush()) is not None:
+                        yield pending_event
 
-                        elif isinstance(event, FunctionToolResultEvent):
+                    # Extract actual error from potential TaskGroup wrapper
+                    actual_error = stream_error
+                    error_traceback = ""
+
+                    # Handle ExceptionGroup (from TaskGroup)
+                    if hasattr(stream_error, "exceptions") and isinstance(
+                        getattr(stream_error, "exceptions"), (list, tuple)
+                    ):
+                        exceptions_list = getattr(stream_error, "exceptions")
+                        logger.debug(
+                            f"Caught ExceptionGroup with {len(exceptions_list)} exceptions"
+                        )
+                        for idx, exc in enumerate(exceptions_list):
+                            logger.error(
+                                f"  Sub-exception {idx}: {type(exc).__name__}: {exc}"
+                            )
                             try:
-                                logger.debug(f"Tool result for {event.tool_call_id}")
-                                result_content = getattr(
-                                    event.result, "content", str(event.result)
+                                tb_lines = traceback.format_exception(
+                                    type(exc), exc, exc.__traceback__
                                 )
-                                yield {
-                                    "type": "tool_result",
-                                    "tool_name": getattr(event, "tool_name", "unknown"),
-                                    "content": result_content,
-                                }
-                            except Exception as tool_error:
-                                logger.error(
-                                    f"Error processing tool result: {tool_error}",
-                                    exc_info=True,
+                                error_traceback += f"\n\n--- Sub-exception {idx} Traceback ---\n{''.join(tb_lines)}"
+                            except:
+                                error_traceback += (
+                                    f"\n\n--- Sub-exception {idx} ---\n{str(exc)}"
                                 )
-
-                        elif isinstance(event, FinalResultEvent):
-                            logger.debug("Final result event received")
-
-                        elif isinstance(event, PartStartEvent):
-                            logger.debug(
-                                f"Starting part {event.index}: {type(event.part).__name__}"
-                            )
-
-                        elif isinstance(event, PartEndEvent):
-                            logger.debug(
-                                f"Ending part {event.index}: {type(event.part).__name__}"
-                            )
-
-                        else:
-                            logger.debug(
-                                f"Unhandled event type: {type(event).__name__}"
-                            )
-
-                    except Exception as event_error:
-                        logger.error(
-                            f"Error processing event {type(event).__name__}: {event_error}",
-                            exc_info=True,
+                        actual_error = (
+                            exceptions_list[0] if exceptions_list else stream_error
                         )
-                        continue
-
-                # Send final message
-                yield {
-                    "type": "final",
-                    "content": full_text,
-                    "thinking": full_thinking if full_thinking else None,
-                    "usage": {
-                        "input_tokens": self.usage.total_tokens
-                        if hasattr(self.usage, "total_tokens")
-                        else 0,
-                        "output_tokens": self.usage.total_tokens
-                        if hasattr(self.usage, "total_tokens")
-                        else 0,
-                    },
-                }
 
-            except Exception as stream_error:
-                # Extract actual error from potential TaskGroup wrapper
-                actual_error = stream_error
-                error_traceback = ""
-
-                import traceback
-                import sys
-
-                # Handle ExceptionGroup (from TaskGroup)
-                if hasattr(stream_error, "exceptions") and isinstance(
-                    getattr(stream_error, "exceptions"), (list, tuple)
-                ):
-                    exceptions_list = getattr(stream_error, "exceptions")
-                    logger.debug(
-                        f"Caught ExceptionGroup with {len(exceptions_list)} exceptions"
+                    error_msg = (
+                        f"Stream error: {type(actual_error).__name__}: {str(actual_error)}"
                     )
-                    for idx, exc in enumerate(exceptions_list):
-                        logger.error(
-                            f"  Sub-exception {idx}: {type(exc).__name__}: {exc}"
+                    logger.error(error_msg)
+                    if error_traceback:
+                        logger.error(f"Full error details:{error_traceback}")
+                    else:
+                        logger.error(f"Stream traceback:", exc_info=True)
+
+                    # If this looks like an MCP connection error, try to remove
+                    # the bad server(s) and retry the stream once.
+                    actual_str = str(actual_error).lower()
+                    is_mcp_error = any(
+                        indicator in actual_str
+                        for indicator in [
+                            "session terminated",
+                            "mcperror",
+                            "connection closed",
+                        ]
+                    )
+                    if is_mcp_error and await self._remove_bad_toolsets_and_rebuild(
+                        actual_error
+                    ):
+                        logger.info(
+                            "Retrying stream after removing unhealthy MCP server(s)"
                         )
                         try:
-                            tb_lines = traceback.format_exception(
-                                type(exc), exc, exc.__traceback__
-                            )
-                            error_traceback += f"\n\n--- Sub-exception {idx} Traceback ---\n{''.join(tb_lines)}"
-                        except:
-                            error_traceback += (
-                                f"\n\n--- Sub-exception {idx} ---\n{str(exc)}"
-                            )
-                    actual_error = (
-                        exceptions_list[0] if exceptions_list else stream_error
-                    )
+                            self._reset_toolset_state()
+                            async for event in self.agent.run_stream_events(
+                                message_content,
+                                message_history=self.message_history,
+                                model_settings=self._stream_model_settings(),
+                            ):
+                                handler = self._STREAM_DISPATCH.get(type(event))
+                                if handler is None:
+                                    continue
+                                try:
+                                    out = handler(self, event, state)
+                                except Exception:
+                                    continue
+                                if out is not None:
+                                    for pending_event in state.emit(out):
+                                        yield pending_event
 
-                error_msg = (
-                    f"Stream error: {type(actual_error).__name__}: {str(actual_error)}"
-                )
-                logger.error(error_msg)
-                if error_traceback:
-                    logger.error(f"Full error details:{error_traceback}")
-                else:
-                    logger.error(f"Stream traceback:", exc_info=True)
+                            if (pending_event := state.flush()) is not None:
+                                yield pending_event
 
-                # If this looks like an MCP connection error, try to remove
-                # the bad server(s) and retry the stream once.
-                actual_str = str(actual_error).lower()
-                is_mcp_error = any(
-                    indicator in actual_str
-                    for indicator in [
-                        "session terminated",
-                        "mcperror",
-                        "connection closed",
-                    ]
-                )
-                if is_mcp_error and await self._remove_bad_toolsets_and_rebuild(
-                    actual_error
-                ):
-                    logger.info(
-                        "Retrying stream after removing unhealthy MCP server(s)"
-                    )
-                    try:
-                        self._reset_toolset_state()
-                        async for event in self.agent.run_stream_events(
-                            message_content,
-                            message_history=self.message_history,
-                        ):
-                            try:
-                                if isinstance(event, AgentRunResultEvent):
-                                    self.usage = event.result.usage()
-                                    self.message_history = event.result.all_messages()
-                                    continue
-                                if isinstance(event, PartDeltaEvent):
-                                    if isinstance(event.delta, TextPartDelta):
-                                        text_chunk = event.delta.content_delta
-                                        if text_chunk:
-                                            full_text += text_chunk
-                                            yield {
-                                                "type": "text_delta",
-                                                "content": text_chunk,
-                                            }
-                                    elif isinstance(event.delta, ThinkingPartDelta):
-                                        thinking_chunk = event.delta.content_delta
-                                        if thinking_chunk:
-                                            full_thinking += thinking_chunk
-                                            yield {
-                                                "type": "thinking_delta",
-                                                "content": thinking_chunk,
-                                            }
-                                elif isinstance(event, FunctionToolCallEvent):
-                                    yield {
-                                        "type": "tool_call",
-                                        "tool_name": event.part.tool_name,
-                                        "tool_args": event.part.args,
-                                    }
-                                elif isinstance(event, FunctionToolResultEvent):
-                                    result_content = getattr(
-                                        event.result,
-                                        "content",
-                                        str(event.result),
-                                    )
-                                    yield {
-                                        "type": "tool_result",
-                                        "tool_name": getattr(
-                                            event, "tool_name", "unknown"
-                                        ),
-                                        "content": result_content,
-                                    }
-                            except Exception:
-                                continue
-
-                        yield {
-                            "type": "final",
-                            "content": full_text,
-                            "thinking": full_thinking or None,
-                            "usage": {
-                                "input_tokens": self.usage.total_tokens
-                                if hasattr(self.usage, "total_tokens")
-                                else 0,
-                                "output_tokens": self.usage.total_tokens
-                                if hasattr(self.usage, "total_tokens")
-                                else 0,
-                            },
-                        }
-                        return  # retry succeeded, skip the error yield
-                    except Exception as retry_err:
-                        logger.error(f"Retry stream also failed: {retry_err}")
-                        yield {
-                            "type": "error",
-                            "content": f"Stream error (retry failed): {retry_err}",
-                        }
-                        return
+                            yield self._final_event(state)
+                            return  # retry succeeded, skip the error yield
+                        except Exception as retry_err:
+                            logger.error(f"Retry stream also failed: {retry_err}")
+                            yield {
+                                "type": "error",
+                                "content": f"Stream error (retry failed): {retry_err}",
+                            }
+                            return
 
-                yield {"type": "error", "content": error_msg}
+                    yield {"type": "error", "content": error_msg}
+                    return
 
         except KeyError as e:
             error_msg = (
@@ -528,6 +837,106 @@ class BaseAgent(AgentCore, ABC):
             logger.error(error_msg, exc_info=True)
             yield {"type": "error", "content": error_msg}
 
+    async def run_query_stream_bytes(
+        self,
+        query: str,
+        image_paths: Optional[Union[str, Path, list[Union[str, Path]]]] = None,
+        text_only: bool = False,
+    ):
+        """run_query_stream() with each event pre-encoded as a JSON line.
+
+        Yields bytes (one JSON object plus a newline per event), ready to
+        write to an SSE/NDJSON response without another encoding pass.
+        Uses orjson when installed, pydantic-core's encoder otherwise.
+        """
+        async for event in self.run_query_stream(query, image_paths, text_only):
+            yield _dumps(event) + b"\n"
+
+    # ========================================================================
+    # Stream event handlers - dispatched by exact event type
+    # ========================================================================
+
+    def _final_event(self, state: _StreamState) -> dict:
+        """Build the closing 'final' event from the accumulated stream state."""
+        usage = self.usage
+        return {
+            "type": "final",
+            "content": state.text,
+            "thinking": state.thinking,
+            "usage": {
+                "input_tokens": getattr(usage, "input_tokens", 0),
+                "output_tokens": getattr(usage, "output_tokens", 0),
+                "total_tokens": getattr(usage, "total_tokens", 0),
+            },
+        }
+
+    def _on_run_result(self, event, state: _StreamState) -> Optional[dict]:
+        self.usage = event.result.usage()
+        self._append_messages(event.result.new_messages())
+        return None
+
+    def _on_part_delta(self, event, state: _StreamState) -> Optional[dict]:
+        delta = event.delta
+        delta_type = type(delta)
+        if delta_type is TextPartDelta:
+            text_chunk = delta.content_delta
+            if text_chunk:
+                state.text_parts.append(text_chunk)
+                return {"type": "text_delta", "content": text_chunk}
+        elif delta_type is ThinkingPartDelta:
+            thinking_chunk = delta.content_delta
+            if thinking_chunk:
+                state.thinking_parts.append(thinking_chunk)
+                if state.text_only:
+                    return None
+                # Deferred formatting: nothing is built unless DEBUG is enabled
+                logger.debug("Streaming thinking delta: {} chars", len(thinking_chunk))
+                return {"type": "thinking_delta", "content": thinking_chunk}
+        return None
+
+    def _on_tool_call(self, event, state: _StreamState) -> Optional[dict]:
+        if state.text_only:
+            return None
+        logger.debug(f"Tool call: {event.part.tool_name}")
+        return {
+            "type": "tool_call",
+            "tool_name": event.part.tool_name,
+            "tool_args": _to_jsonable(event.part.args),
+        }
+
+    def _on_tool_result(self, event, state: _StreamState) -> Optional[dict]:
+        if state.text_only:
+            return None
+        logger.debug(f"Tool result for {event.tool_call_id}")
+        return {
+            "type": "tool_result",
+            "tool_name": getattr(event, "tool_name", "unknown"),
+            "content": _to_jsonable(getattr(event.result, "content", str(event.result))),
+        }
+
+    def _on_final_result(self, event, state: _StreamState) -> Optional[dict]:
+        logger.debug("Final result event received")
+        return None
+
+    def _on_part_start(self, event, state: _StreamState) -> Optional[dict]:
+        logger.debug(f"Starting part {event.index}: {type(event.part).__name__}")
+        return None
+
+    def _on_part_end(self, event, state: _StreamState) -> Optional[dict]:
+        logger.debug(f"Ending part {event.index}: {type(event.part).__name__}")
+        return None
+
+    # One dict lookup per event instead of an isinstance ladder per token
+    _STREAM_DISPATCH = {
+        AgentRunResultEvent: _on_run_result,
+        PartDeltaEvent: _on_part_delta,
+        FunctionToolCallEvent: _on_tool_call,
+        FunctionToolResultEvent: _on_tool_result,
+        FinalResultEvent: _on_final_result,
+        PartStartEvent: _on_part_start,
+        PartEndEvent: _on_part_end,
+    }
+
     # ========================================================================
     # Iteration Pattern - Step-by-step execution with custom processing
     # ========================================================================
@@ -563,6 +972,7 @@ class BaseAgent(AgentCore, ABC):
             The agent run result (accessible after iteration completes).
         """
         try:
+            await self.aready()
             async with self.agent.iter(query) as agent_run:
                 step = 0
                 async for node in agent_run:
@@ -585,63 +995,169 @@ class BaseAgent(AgentCore, ABC):
     # Helper Methods
     # ========================================================================
 
+    async def _process_images(
+        self,
+        image_paths: Optional[Union[str, Path, list[Union[str, Path]]]],
+    ) -> tuple[list[ImageUrl], Optional[str]]:
+        """Process all images concurrently into ImageUrl message parts.
+
+        Returns:
+            (images, error_message). error_message describes the first
+            image (in input order) that failed, or is None on success.
+        """
+        if not image_paths:
+            return [], None
+        if not isinstance(image_paths, list):
+            image_paths = [image_paths]
+
+        results = await asyncio.gather(
+            *(self._image_url(p) for p in image_paths), return_exceptions=True
+        )
+        for img_path, result in zip(image_paths, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to process image {img_path}: {result}")
+                return [], f"Error: Failed to process image {img_path}: {result}"
+
+        return [r for r in results if r], None
+
     async def _process_image(self, image_path: Union[str, Path]) -> Optional[str]:
         """Process an image path/URL and return a data URL.
 
         Delegates to FileProcessor.prepare_for_vlm() for the actual work.
         """
-        from .file_processor import FileProcessor
+        image = await self._image_url(image_path)
+        return image.url if image else None
+
+    async def _image_url(self, image_path: Union[str, Path]) -> Optional[ImageUrl]:
+        """Process an image path/URL into an ImageUrl ready for the prompt.
+
+        Finished ImageUrl objects are kept in a small LRU cache so agents
+        that reuse the same reference images don't re-read, re-encode or
+        re-validate them. data: URLs are wrapped but never cached.
+        """
+        source = str(image_path)
+        if source.startswith("data:"):
+            data_url = await FileProcessor.prepare_for_vlm(source)
+            return ImageUrl(url=data_url) if data_url else None
+
+        key = await self._image_cache_key(source)
+        if key is not None:
+            cached = self._image_cache.get(key)
+            if cached is not None:
+                self._image_cache.move_to_end(key)
+                return cached
+
+        data_url = await FileProcessor.prepare_for_vlm(source, self._http_client())
+        if not data_url:
+            return None
+        image = ImageUrl(url=data_url)
+        if key is not None:
+            self._image_cache[key] = image
+            if len(self._image_cache) > self.IMAGE_CACHE_SIZE:
+                self._image_cache.popitem(last=False)
+        return image
+
+    def _http_client(self) -> httpx.AsyncClient:
+        """Shared HTTP client for image fetches (keep-alive, HTTP/2 if available).
+
+        The client's connection pool is bound to the event loop it was first
+        used on, so a new client is created when called from another loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._http.is_closed or self._http_loop is not loop:
+            self._http = httpx.AsyncClient(
+                http2=_HTTP2,
+                follow_redirects=True,
+                timeout=httpx.Timeout(30.0, connect=5.0),
+                limits=httpx.Limits(max_keepalive_connections=16),
+            )
+            self._http_loop = loop
+        return self._http
+
+    async def _image_cache_key(self, source: str) -> Optional[tuple]:
+        """Build a cache key that changes when the image does.
+
+        Local files are keyed on mtime and size. URLs are keyed on the
+        ETag/Last-Modified from a HEAD request, falling back to the URL
+        alone when the server sends neither. Returns None if the source
+        can't be inspected (the caller then skips the cache).
+        """
+        if source.startswith("http://") or source.startswith("https://"):
+            try:
+                response = await self._http_client().head(source)
+                version = response.headers.get("etag") or response.headers.get(
+                    "last-modified"
+                )
+            except Exception as e:
+                logger.debug(f"HEAD failed for {source}, caching by URL: {e}")
+                version = None
+            return (source, version)
 
-        return await FileProcessor.prepare_for_vlm(image_path)
+        try:
+            stat = Path(source).stat()
+        except OSError:
+            return None
+        return (source, stat.st_mtime_ns, stat.st_size)
 
     async def get_server_info(self) -> list[dict]:
-        """Get information about connected MCP servers and their tools."""
-        from pydantic_ai.mcp import (
-            MCPServerSSE,
-            MCPServerStreamableHTTP,
-            MCPServerStdio,
-        )
+        """Get information about connected MCP servers and their tools.
 
+        Servers are queried concurrently, so the call takes as long as the
+        slowest server rather than the sum of all of them.
+        """
+        await self.aready()
         self._reset_toolset_state()
-        server_info = []
 
-        for toolset in self.toolsets:
-            # Unwrap ToolFilterWrapper to get at the actual MCP server
-            inner = getattr(toolset, "wrapped_toolset", toolset)
+        results = await asyncio.gather(
+            *(self._info_for(ts) for ts in self.toolsets), return_exceptions=True
+        )
+        server_info = []
+        for toolset, info in zip(self.toolsets, results):
+            if isinstance(info, BaseException):
+                inner = getattr(toolset, "wrapped_toolset", toolset)
+                info = {
+                    "server_type": type(inner).__name__.replace("MCPServer", "").lower(),
+                    "server_id": None,
+                    "tools": [{"name": "Error", "description": str(info)}],
+                }
+            server_info.append(info)
 
-            logger.info(f"Gathering info for toolset: {type(inner).__name__}")
-            info = {
-                "server_type": type(inner).__name__.replace("MCPServer", "").lower(),
-                "server_id": None,
-                "tools": [],
-            }
+        return server_info
 
-            if isinstance(inner, MCPServerStdio):
-                info["server_id"] = (
-                    f"{inner.command} {' '.join(inner.args) if inner.args else ''}"
-                )
-            elif isinstance(inner, (MCPServerSSE, MCPServerStreamableHTTP)):
-                info["server_id"] = inner.url
+    async def _info_for(self, toolset) -> dict:
+        """Describe one MCP toolset and list its tools."""
+        # Unwrap ToolFilterWrapper to get at the actual MCP server
+        inner = getattr(toolset, "wrapped_toolset", toolset)
 
-            try:
-                tools = await toolset.list_tools()
-
-                for tool in tools:
-                    info["tools"].append(
-                        {
-                            "name": tool.name,
-                            "description": tool.description
-                            or "No description available",
-                        }
-                    )
+        logger.info(f"Gathering info for toolset: {type(inner).__name__}")
+        # Walk the MRO so our server subclasses report as their pydantic-ai base
+        server_cls = next(
+            (cls for cls in type(inner).__mro__ if cls in _SERVER_ID_FN), type(inner)
+        )
+        server_id_fn = _SERVER_ID_FN.get(server_cls)
+        info = {
+            "server_type": server_cls.__name__.replace("MCPServer", "").lower(),
+            "server_id": server_id_fn(inner) if server_id_fn else None,
+            "tools": [],
+        }
 
-                logger.info(f"Found {len(tools)} tools for {info['server_id']}")
-            except Exception as e:
-                logger.warning(
-                    f"Could not retrieve tools from {info['server_id']}: {e}"
+        try:
+            tools = await toolset.list_tools()
+
+            for tool in tools:
+                info["tools"].append(
+                    {
+                        "name": tool.name,
+                        "description": tool.description
+                        or "No description available",
+                    }
                 )
-                info["tools"] = [{"name": "Error", "description": str(e)}]
 
-            server_info.append(info)
+            logger.info(f"Found {len(tools)} tools for {info['server_id']}")
+        except Exception as e:
+            logger.warning(
+                f"Could not retrieve tools from {info['server_id']}: {e}"
+            )
+            info["tools"] = [{"name": "Error", "description": str(e)}]
 
-        return server_info
+        return info
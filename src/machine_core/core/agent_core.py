@@ -6,10 +6,163 @@ This module defines:
 """
 
 from __future__ import annotations
-from typing import Optional, List
-from pydantic_ai import Agent, Tool
+import asyncio
+import copy
+import dataclasses
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Callable, Optional, List
+from pydantic_ai import Agent, ImageUrl, Tool
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelMessagesTypeAdapter,
+    ModelRequest,
+    SystemPromptPart,
+    UserPromptPart,
+)
 from pydantic_ai.usage import RequestUsage
 from loguru import logger
+from .history_store import HistoryStore
+
+
+# Process-wide pool of validated MCP toolsets, keyed by config file + connection
+# settings. pydantic-ai MCP servers are reference-counted context managers, so
+# several agents can safely share one server object.
+_MCP_POOL: dict[tuple, dict] = {}
+_MCP_POOL_LOCK = threading.Lock()
+
+
+# Resolved LLM/embedding providers shared by all agents with the same provider
+# config, so a second agent reuses the first one's model client and connection
+# pool instead of building its own.
+_PROVIDER_CACHE: dict[str, object] = {}
+_PROVIDER_CACHE_LOCK = threading.Lock()
+
+
+def _cached_provider(kind: str, cfg, resolve: Callable):
+    """Return resolve(cfg), memoized per provider config."""
+    # repr() covers every config field, so any difference yields a new entry
+    key = f"{kind}:{cfg!r}"
+    with _PROVIDER_CACHE_LOCK:
+        if key not in _PROVIDER_CACHE:
+            _PROVIDER_CACHE[key] = resolve(cfg)
+        return _PROVIDER_CACHE[key]
+
+
+def _mcp_pool_key(mcp_config_path: str, agent_config) -> tuple:
+    """Build the pool key for an MCP config file and agent settings.
+
+    Keyed by file content, so identical configs share toolsets and an edited
+    config gets fresh ones.
+    """
+    from .mcp_setup import mcp_config_digest
+
+    digest = mcp_config_digest(mcp_config_path)
+    return (
+        digest.hex() if digest else str(Path(mcp_config_path).resolve()),
+        agent_config.timeout,
+        agent_config.max_tool_retries,
+        agent_config.allow_sampling,
+    )
+
+
+def _acquire_pooled_toolsets(
+    key: tuple, create: Callable[[], tuple[list, list[str]]]
+) -> tuple[list, list[str]]:
+    """Return pooled (toolsets, warnings) for key, creating them on first use."""
+    with _MCP_POOL_LOCK:
+        entry = _MCP_POOL.get(key)
+        if entry is None:
+            toolsets, warnings = create()
+            entry = _MCP_POOL[key] = {
+                "toolsets": toolsets,
+                "warnings": warnings,
+                "validated": False,
+                "refs": 0,
+            }
+        else:
+            logger.info(f"Reusing {len(entry['toolsets'])} pooled MCP toolset(s)")
+        entry["refs"] += 1
+        return list(entry["toolsets"]), list(entry["warnings"])
+
+
+def _pooled_validation(key: tuple) -> Optional[tuple[list, list[str]]]:
+    """Return validated (toolsets, warnings) for key, if an agent already ran aready()."""
+    with _MCP_POOL_LOCK:
+        entry = _MCP_POOL.get(key)
+        if entry is None or not entry["validated"]:
+            return None
+        return list(entry["toolsets"]), list(entry["warnings"])
+
+
+def _store_pooled_validation(key: tuple, toolsets: list, warnings: list[str]):
+    """Publish validated toolsets so other agents sharing key skip validation."""
+    with _MCP_POOL_LOCK:
+        entry = _MCP_POOL.get(key)
+        if entry is not None:
+            entry["toolsets"] = list(toolsets)
+            entry["warnings"] = list(warnings)
+            entry["validated"] = True
+
+
+def _release_pooled_toolsets(key: tuple):
+    """Drop a reference to pooled toolsets, evicting them when unused."""
+    with _MCP_POOL_LOCK:
+        entry = _MCP_POOL.get(key)
+        if entry is None:
+            return
+        entry["refs"] -= 1
+        if entry["refs"] <= 0:
+            del _MCP_POOL[key]
+            logger.debug("Released pooled MCP toolsets")
+
+
+# Flat estimate per image/binary attachment; its serialized base64 says
+# nothing about what the provider actually bills for it
+_MEDIA_TOKENS = 1000
+
+
+def _estimate_tokens(messages: list[ModelMessage]) -> int:
+    """Rough token count (~4 bytes of serialized JSON per token).
+
+    Images and other attachments in user prompts count a flat
+    ``_MEDIA_TOKENS`` each instead of the length of their base64 data.
+
+    Provider-agnostic on purpose: the configured models (Gemini, Claude,
+    gpt-oss, ...) don't share a tokenizer, and the estimate only has to
+    tell when history is getting close to the context window.
+    """
+    if not messages:
+        return 0
+    media = 0
+    text_only = []
+    for msg in messages:
+        if isinstance(msg, ModelRequest):
+            parts = []
+            for part in msg.parts:
+                if isinstance(part, UserPromptPart) and not isinstance(part.content, str):
+                    text = [c for c in part.content if isinstance(c, str)]
+                    media += len(part.content) - len(text)
+                    part = dataclasses.replace(part, content=text)
+                parts.append(part)
+            msg = dataclasses.replace(msg, parts=parts)
+        text_only.append(msg)
+    return len(ModelMessagesTypeAdapter.dump_json(text_only)) // 4 + media * _MEDIA_TOKENS
+
+
+def _split_turns(messages: list[ModelMessage]) -> list[list[ModelMessage]]:
+    """Split a flat message list into turns, each starting at a user prompt."""
+    turns: list[list[ModelMessage]] = []
+    for msg in messages:
+        starts_turn = isinstance(msg, ModelRequest) and any(
+            isinstance(part, UserPromptPart) for part in msg.parts
+        )
+        if starts_turn or not turns:
+            turns.append([])
+        turns[-1].append(msg)
+    return turns
 
 
 class AgentCore:
@@ -52,15 +205,37 @@ class AgentCore:
             agent_config: AgentConfig instance for runtime configuration.
                          If None, loads from environment variables.
         """
-        from .config import AgentConfig
+        from .config import get_config
 
-        # Use provided config or load from environment
+        # Use provided config or a copy of the one loaded from environment
         if agent_config is None:
-            agent_config = AgentConfig.from_env()
+            agent_config = get_config().model_copy()
 
         self.agent_config = agent_config
         self.system_prompt = system_prompt
 
+        # Finished ImageUrl parts keyed by (source, version), see BaseAgent
+        self._image_cache: OrderedDict[tuple, ImageUrl] = OrderedDict()
+        # Pooled HTTP client for image fetches, created lazily by BaseAgent
+        self._http = None
+        self._http_loop = None
+
+        # Conversation turns: a sliding window in memory, optionally logged
+        # to SQLite so the full history survives restarts. Agents sharing the
+        # database file keep apart by session.
+        self._history_turns: deque[list[ModelMessage]] = deque()
+        # _estimate_tokens() of each turn, kept alongside _history_turns
+        self._turn_tokens: deque[int] = deque()
+        self._history_window: list[ModelMessage] = []
+        self._history_store = (
+            HistoryStore(
+                agent_config.history_db_path,
+                session=agent_config.history_session or type(self).__name__,
+            )
+            if agent_config.history_db_path
+            else None
+        )
+
         # |----------------------------------------------------------|
         # |-----------------------Set up tools-----------------------|
         # |----------------------------------------------------------|
@@ -69,88 +244,38 @@ class AgentCore:
 
         # MCP toolsets: skip loading if only dynamic tools are provided
         self.toolsets = []
+        self.toolsets_unvalidated = []
         self.validation_warnings = []
+        self._mcp_pool_key = None
+        # MCP toolsets are validated on the caller's event loop by aready();
+        # concurrent first callers share one validation task
+        self._toolsets_ready = True
+        self._ready_task: Optional[asyncio.Task] = None
 
         if tools and not tools_urls:
             # Pure dynamic tools mode: skip MCP entirely
             logger.info(f"Using {len(self.tools)} dynamic tool(s), skipping MCP setup")
         else:
             # MCP mode (original behavior) or hybrid mode
-            from .mcp_setup import (
-                load_mcp_servers_from_config,
-                setup_mcp_toolsets,
-                validate_and_fix_toolsets,
-            )
+            from .mcp_setup import load_mcp_servers_from_config
 
             if tools_urls is None:
-                tools_urls = load_mcp_servers_from_config(mcp_config_path)
-
-            self.toolsets = setup_mcp_toolsets(
-                tools_urls,
-                timeout=self.agent_config.timeout,
-                max_retries=self.agent_config.max_tool_retries,
-                allow_sampling=self.agent_config.allow_sampling,
-            )
-
-            # Validate toolsets
-            try:
-                import asyncio
-
-                try:
-                    loop = asyncio.get_running_loop()
-                    logger.info(
-                        "Running toolset validation in existing event loop context"
-                    )
-                    import concurrent.futures
-
-                    def validate_in_thread():
-                        """Validate toolsets in a separate thread with its own event loop."""
-                        new_loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(new_loop)
-                        try:
-                            result = new_loop.run_until_complete(
-                                validate_and_fix_toolsets(self.toolsets)
-                            )
-                            return result
-                        finally:
-                            new_loop.close()
-
-                    with concurrent.futures.ThreadPoolExecutor(
-                        max_workers=1
-                    ) as executor:
-                        future = executor.submit(validate_in_thread)
-                        self.toolsets, self.validation_warnings = future.result(
-                            timeout=30
-                        )
-                        logger.info(f"Validated {len(self.toolsets)} toolset(s)")
-
-                except RuntimeError:
-                    # No running loop, create a new one
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        self.toolsets, self.validation_warnings = (
-                            loop.run_until_complete(
-                                validate_and_fix_toolsets(self.toolsets)
-                            )
-                        )
-                        logger.info(f"Validated {len(self.toolsets)} toolset(s)")
-                    finally:
-                        loop.close()
-            except Exception as e:
-                logger.warning(f"Could not validate toolsets: {e}", exc_info=True)
-
-            # Reset async state on all toolsets after validation.
-            # Validation opens/closes MCP connections on a temporary event
-            # loop, leaving asyncio.Lock objects bound to that (now-dead) loop.
-            # Calling __post_init__() re-creates locks so the toolsets work
-            # correctly when the caller's actual event loop runs them later.
-            for ts in self.toolsets:
-                # Unwrap ToolFilterWrapper to reach the underlying MCPServer
-                inner = getattr(ts, "wrapped_toolset", ts)
-                if hasattr(inner, "__post_init__"):
-                    inner.__post_init__()
-                    logger.debug(f"Reset async state for {inner.__class__.__name__}")
+                # Agents built from the same config file share one set of
+                # MCP toolsets instead of spawning/validating them again.
+                self._mcp_pool_key = _mcp_pool_key(mcp_config_path, self.agent_config)
+                self.toolsets, self.validation_warnings = _acquire_pooled_toolsets(
+                    self._mcp_pool_key,
+                    lambda: self._setup_mcp_toolsets(
+                        load_mcp_servers_from_config(mcp_config_path)
+                    ),
+                )
+                self._toolsets_ready = (
+                    _pooled_validation(self._mcp_pool_key) is not None
+                )
+            else:
+                self._setup_mcp_toolsets(tools_urls)
+                self._toolsets_ready = not self.toolsets
+            self.toolsets_unvalidated = list(self.toolsets)
 
         # |----------------------------------------------------------|
         # |-----------------------Set up model-----------------------|
@@ -161,19 +286,30 @@ class AgentCore:
         cfg = LLMProviderConfig.from_env()
         if model_name and model_name != cfg.model_name:
             cfg.model_name = model_name
-        resolved = get_llm_provider(cfg)
+        resolved = _cached_provider("llm", cfg, get_llm_provider)
 
         # model-providers now returns a fully-constructed pydantic-ai model
         # (OpenAIChatModel, GoogleModel, or AnthropicModel) with settings baked in.
         self.model = resolved.model
         self.provider_type = resolved.provider_type
+        self.context_window = agent_config.context_window_tokens or getattr(
+            cfg, "context_window", None
+        )
+        if agent_config.history_compaction_ratio and not self.context_window:
+            logger.warning(
+                "History compaction is enabled but the model's context window "
+                "is unknown; set AGENT_CONTEXT_WINDOW_TOKENS to enable it"
+            )
+        self._llm_cfg = cfg
 
         # |----------------------------------------------------------|
         # |-------------------Set up embedding backend---------------|
         # |----------------------------------------------------------|
         try:
             emb_cfg = EmbeddingProviderConfig.from_env()
-            resolved_embedding = get_embedding_provider(emb_cfg)
+            resolved_embedding = _cached_provider(
+                "embedding", emb_cfg, get_embedding_provider
+            )
             self.embedding = resolved_embedding.provider
             self.embedding_model_name = resolved_embedding.model_name
         except Exception as e:
@@ -196,8 +332,214 @@ class AgentCore:
         else:
             print(f"Total toolsets: {toolset_count}")
 
-        # Validate tools after agent creation
-        self._validate_agent_tools()
+        # Walking every tool schema is slow with many tools; by default it
+        # runs lazily on the first get_validation_warnings() call instead.
+        if self.agent_config.debug_validation:
+            self._validate_agent_tools()
+
+    def _setup_mcp_toolsets(self, tools_urls: list) -> tuple[list, list[str]]:
+        """Create MCP toolsets for the given server configs.
+
+        Only builds the server objects; schema validation needs a live
+        event loop and is deferred to aready().
+
+        Sets and returns (self.toolsets, self.validation_warnings).
+        """
+        from .mcp_setup import setup_mcp_toolsets
+
+        self.toolsets = setup_mcp_toolsets(
+            tools_urls,
+            timeout=self.agent_config.timeout,
+            max_retries=self.agent_config.max_tool_retries,
+            allow_sampling=self.agent_config.allow_sampling,
+        )
+        self.validation_warnings = []
+        return self.toolsets, self.validation_warnings
+
+    async def aready(self):
+        """Validate MCP toolsets on the running event loop.
+
+        Lists each server's tools and filters out tools with schemas that
+        crash some models (see validate_and_fix_toolsets). Called
+        automatically before the first query; call it yourself after
+        construction to surface validation warnings early. Idempotent, and
+        safe to call concurrently: later callers await the first caller's
+        validation instead of starting their own and rebuilding the agent
+        underneath it.
+        """
+        if self._toolsets_ready:
+            return
+
+        task = self._ready_task
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = self._ready_task = asyncio.ensure_future(self._validate_toolsets())
+        try:
+            # Shielded so one cancelled caller doesn't cancel it for the rest
+            await asyncio.shield(task)
+        finally:
+            if task.done() and self._ready_task is task:
+                self._ready_task = None
+
+    async def _validate_toolsets(self):
+        """Body of aready(); runs at most once at a time per agent."""
+        from .mcp_setup import validate_and_fix_toolsets
+
+        pooled = (
+            _pooled_validation(self._mcp_pool_key)
+            if self._mcp_pool_key is not None
+            else None
+        )
+        if pooled is not None:
+            toolsets, warnings = pooled
+        else:
+            try:
+                toolsets, warnings = await validate_and_fix_toolsets(
+                    self.toolsets_unvalidated
+                )
+                logger.info(f"Validated {len(toolsets)} toolset(s)")
+            except Exception as e:
+                logger.warning(f"Could not validate toolsets: {e}", exc_info=True)
+                toolsets, warnings = list(self.toolsets_unvalidated), []
+            if self._mcp_pool_key is not None:
+                _store_pooled_validation(self._mcp_pool_key, toolsets, warnings)
+
+        self._toolsets_ready = True
+        self.validation_warnings = warnings
+        # Leave toolsets alone if the caller already swapped them out
+        # (e.g. filtered wrappers passed to rebuild_agent)
+        if self.toolsets == self.toolsets_unvalidated and toolsets != self.toolsets:
+            self.rebuild_agent(toolsets=toolsets)
+        self.toolsets_unvalidated = list(toolsets)
+
+    @property
+    def message_history(self) -> list[ModelMessage]:
+        """Messages sent as context on the next run.
+
+        Holds the last agent_config.context_window_turns turns (all turns
+        when 0). Assigning a list replaces the window; the history
+        database, if any, is append-only and left untouched.
+        """
+        return self._history_window
+
+    @message_history.setter
+    def message_history(self, messages: list[ModelMessage]):
+        self._set_turns(_split_turns(messages))
+
+    @property
+    def history_tokens(self) -> int:
+        """Estimated size of message_history in tokens (see _estimate_tokens)."""
+        return sum(self._turn_tokens)
+
+    def _set_turns(self, turns: list[list[ModelMessage]]):
+        """Replace the in-memory turns, estimating each one's size once."""
+        self._history_turns = deque(turns)
+        self._turn_tokens = deque(_estimate_tokens(turn) for turn in turns)
+        self._trim_history()
+
+    def _append_messages(self, messages: list[ModelMessage]):
+        """Record the new messages from one completed run as a turn."""
+        if not messages:
+            return
+        self._history_turns.append(list(messages))
+        self._turn_tokens.append(_estimate_tokens(messages))
+        self._trim_history()
+        if self._history_store is not None:
+            self._history_store.append_turn(messages)
+
+    def _trim_history(self):
+        """Drop turns beyond the window and rebuild the flat message list."""
+        limit = self.agent_config.context_window_turns
+        if limit and len(self._history_turns) > limit:
+            while len(self._history_turns) > limit:
+                self._history_turns.popleft()
+                self._turn_tokens.popleft()
+            self._ensure_system_prompt()
+        self._history_window = [msg for turn in self._history_turns for msg in turn]
+
+    def _ensure_system_prompt(self):
+        """Put the system prompt back at the head of a trimmed history.
+
+        pydantic-ai only adds the system prompt to a run with empty history;
+        otherwise it expects it in the first request. Once the first turn has
+        been dropped (or history is restored from disk) it has to be re-added.
+        """
+        if not self._history_turns or not self.system_prompt:
+            return
+        head = self._history_turns[0]
+        first = head[0]
+        if isinstance(first, ModelRequest) and not any(
+            isinstance(part, SystemPromptPart) for part in first.parts
+        ):
+            head[0] = dataclasses.replace(
+                first, parts=[SystemPromptPart(self.system_prompt), *first.parts]
+            )
+            self._turn_tokens[0] = _estimate_tokens(head)
+
+    def restore_history(self):
+        """Rebuild the in-memory window from the history database.
+
+        No-op when agent_config.history_db_path is not set.
+        """
+        if self._history_store is None:
+            return
+        self._set_turns(
+            self._history_store.load_turns(self.agent_config.context_window_turns)
+        )
+        self._ensure_system_prompt()
+        self._trim_history()
+        logger.info(
+            f"Restored {len(self._history_turns)} turn(s) from {self._history_store.path}"
+        )
+
+    def _summary_model(self):
+        """Model used to compact history; agent_config.summary_model_name or the main model."""
+        name = self.agent_config.summary_model_name
+        if not name or name == self._llm_cfg.model_name:
+            return self.model
+
+        from model_providers import get_llm_provider
+
+        cfg = copy.copy(self._llm_cfg)
+        cfg.model_name = name
+        return _cached_provider("llm", cfg, get_llm_provider).model
+
+    def _release_mcp_pool(self):
+        """Drop this agent's reference to its pooled MCP toolsets."""
+        if self._mcp_pool_key is not None:
+            _release_pooled_toolsets(self._mcp_pool_key)
+            self._mcp_pool_key = None
+
+    @property
+    def prompt_cache_key(self) -> str:
+        """Stable ID for the static system-prompt prefix.
+
+        Derived from the prompt text (not ``hash()``, which is salted per
+        process), so every agent sharing a system prompt shares a cache slot.
+        """
+        return hashlib.blake2b(
+            self.system_prompt.encode("utf-8"), digest_size=16
+        ).hexdigest()
+
+    def _model_settings(self) -> dict:
+        """Model settings that let the provider reuse the cached prompt prefix.
+
+        pydantic-ai always sends the system prompt first, followed by the tool
+        definitions, so the static prefix is identical on every turn. OpenAI
+        and Anthropic need an explicit hint to cache it; Ollama and vLLM reuse
+        a matching prefix automatically. provider_type is the model family
+        ("openai", "google" or "anthropic"), not the LLM_PROVIDER key.
+        """
+        if not self.agent_config.prompt_cache or not self.system_prompt:
+            return {}
+
+        if self.provider_type == "openai":
+            return {"openai_prompt_cache_key": self.prompt_cache_key}
+        if self.provider_type == "anthropic":
+            return {
+                "anthropic_cache_instructions": True,
+                "anthropic_cache_tool_definitions": True,
+            }
+        return {}
 
     def _build_agent(self):
         """Build the pydantic-ai Agent from current model, tools, and toolsets."""
@@ -207,7 +549,9 @@ class AgentCore:
             toolsets=self.toolsets,
             system_prompt=self.system_prompt,
             retries=self.agent_config.max_tool_retries,
+            model_settings=self._model_settings() or None,
         )
+        self._tool_issues: Optional[list[str]] = None
         self.usage = RequestUsage()
         self.message_history = []
 
@@ -245,7 +589,9 @@ class AgentCore:
             toolsets=self.toolsets,
             system_prompt=self.system_prompt,
             retries=retries or self.agent_config.max_tool_retries,
+            model_settings=self._model_settings() or None,
         )
+        self._tool_issues = None
         self.usage = RequestUsage()
         # Preserve message_history across rebuilds (caller can reset if needed)
         logger.info(
@@ -253,12 +599,15 @@ class AgentCore:
             f"and {len(self.toolsets)} MCP toolset(s)"
         )
 
-    def _validate_agent_tools(self):
-        """Validate tools in the created agent."""
+    def _validate_agent_tools(self) -> list[str]:
+        """Validate tools in the created agent.
+
+        Returns the schema issues found and caches them until the agent is
+        rebuilt.
+        """
+        issues_found = []
         try:
             if hasattr(self.agent, "_function_tools") and self.agent._function_tools:
-                issues_found = []
-
                 for tool_name, tool_def in self.agent._function_tools.items():
                     logger.debug(f"Validating agent tool: {tool_name}")
 
@@ -294,7 +643,11 @@ class AgentCore:
                 logger.debug("No function tools found in agent to validate")
         except Exception as e:
             logger.warning(f"Could not validate agent tools: {e}")
+        self._tool_issues = issues_found
+        return issues_found
 
     def get_validation_warnings(self) -> list[str]:
-        """Get validation warnings from MCP server initialization."""
-        return self.validation_warnings
+        """Get validation warnings from MCP server initialization and tool schemas."""
+        if self._tool_issues is None:
+            self._validate_agent_tools()
+        return self.validation_warnings + self._tool_issues
@@ -1,309 +1,117 @@
-from pydantic import BaseModel
+import functools
+from importlib import resources
+from typing import Optional
+from pydantic import BaseModel, ConfigDict, model_validator
 
-SYSTEM_PROMPT = """
-You are a highly intelligent multi-modal AI agent designed to help the user with whatever they ask using the tools in your arsenal. you always research and ask for minimal user interaction and make reports. You always try to use the tools available to you before asking the user for more information. You have access to a variety of tools, each specialized for different tasks. Use them wisely to achieve the best results for the user.
-You dont stop in th middle of a task, you always try to finish what you started unless the user asks you to stop.
-if errors occur, you try to fix them yourself without asking the user for help. you reason what the user wants and try to deliver it using the tools available to you.
+# Prompts live as text files in machine_core/prompts/ and are read on first
+# use, so a process only loads the prompts it actually needs.
+_PROMPT_PACKAGE = "machine_core.prompts"
 
-the mcp server gives you the makes the chart and host it for you giving back just a url to use for display.
 
-DO NOT Try to use the image url as input for other tools. thats the rsult:  mcp-server-chart gives you a url pointing to an image its hosting for you 
+@functools.cache
+def _load_prompt(name: str) -> str:
+    """Read prompts/<name>.txt once per process."""
+    return (
+        resources.files(_PROMPT_PACKAGE)
+        .joinpath(f"{name}.txt")
+        .read_text(encoding="utf-8")
+        .strip()
+    )
 
-so you never answer like: "The provided image URL does not correspond to any of the available chart generation functions. None of the tools listed can process or analyze image URLs directly. The available functions are designed to generate charts from structured data (e.g., scatter plots, treemaps, word clouds), not to handle image inputs.
 
-No function call is applicable here."
+def get_system_prompt() -> str:
+    """General multi-modal agent prompt."""
+    return _load_prompt("system")
 
 
-Read on the tool descriptions carefully and use the right tool for the right task in the right way.
-if a tool fails it might be you used it wrong, retry using the tool correctly.
-""".strip()
+def get_history_summary_prompt() -> str:
+    """Instructions for compacting old conversation history."""
+    return _load_prompt("history_summary")
 
-DRIVSTOFF_PROMPT = """
-You are a **fuel information extraction model** named **drivstoffapp**.
-Your purpose is to extract all visible fuel-related information from an image of a **bensin stasjon** (gas station sign, price board, flyer, or advertisement) and return it **strictly as JSON**, without any explanations or extra text.
 
----
+def get_drivstoff_prompt() -> str:
+    """Fuel price extraction from gas station images."""
+    return _load_prompt("drivstoff")
 
-### INPUT
 
-```xml
-<image>FUEL_INFORMATION_IMAGE</image>
-```
+def get_altlokalt_prompt() -> str:
+    """Company info extraction from flyers."""
+    return _load_prompt("altlokalt")
 
-### EXPECTED OUTPUT
 
-```xml
-<output>
-{
-  "station_name": "",
-  "location": "",
-  "fuels": [
-    {
-      "type": "",
-      "price": 0.0,
-      "currency": ""
-    }
-  ],
-  "timestamp": "",
-  "extra_info": ""
-}
-</output>
-```
-
----
-
-### FIELD DEFINITIONS
-
-* **station_name** → The name or brand of the fuel station (e.g., Circle K, Esso, Shell).
-* **location** → The visible or identifiable location name, address, or city. If not visible, leave empty.
-* **fuels** → A list of fuel types (e.g., Bensin 95, Diesel, HVO, Bensin 98) and their visible prices.
-* **price** → The numeric price value as shown (use a decimal).
-* **currency** → The currency symbol or abbreviation (e.g., “NOK”, “kr”).
-* **timestamp** → If a date or time is visible in the image, extract it. Otherwise leave empty.
-* **extra_info** → Any other readable text that may be related to the fuel prices (campaigns, discounts, etc.).
-
----
-
-### BEHAVIORAL RULES
-
-<instruction>RETURN OUTPUT IN VALID JSON FORMAT ONLY — NO EXTRA TEXT, COMMENTS, MARKUP, OR EXPLANATIONS.</instruction>
-
-<instruction>DO NOT HALLUCINATE. IF ANY FIELD IS UNKNOWN OR UNCLEAR, LEAVE IT EMPTY OR USE AN EMPTY ARRAY AS APPROPRIATE.</instruction>
-
-<instruction>NEVER REWRITE, SUMMARIZE, OR INTERPRET TEXT. EXTRACT VALUES EXACTLY AS THEY APPEAR ON THE IMAGE.</instruction>
-
-<instruction>NEVER MODIFY, CORRECT, OR FORMAT ANY EXTRACTED INFORMATION. PRESERVE ORIGINAL SPELLING, SYMBOLS, AND NUMBER FORMATS.</instruction>
-
-<instruction>NEVER OMIT ANY FUEL TYPE OR PRICE THAT CAN BE CLEARLY READ FROM THE IMAGE.</instruction>
-
-<instruction>RETURN ALL FUEL TYPES AND THEIR PRICES AS THEY APPEAR, EVEN IF SOME ARE MISSING PRICES OR PARTIALLY OBSTRUCTED.</instruction>
-
-<instruction>RETURN ONLY WHAT IS PRESENT IN THE IMAGE. DO NOT GUESS, INFER, OR ADD ANY INFORMATION.</instruction>
-
-<instruction>IF LOCATION INFORMATION IS NOT CLEARLY VISIBLE, RETURN "location": "".</instruction>
-
-<instruction>EXTRACT NUMERIC VALUES EXACTLY AS THEY APPEAR (INCLUDING DECIMAL PLACES). DO NOT CONVERT CURRENCIES OR ROUND VALUES.</instruction>
-
-<instruction>IF MULTIPLE STATIONS OR SIGNS APPEAR, RETURN EACH AS A SEPARATE OBJECT IN THE "fuels" ARRAY UNDER A SHARED STATION NAME.</instruction>
-""".strip()
-
-ALTLOKALT_PROMPT = """
-You are a **company information extraction model** named **altlokalt**.
-Your purpose is to extract all visible company details, services, and products from a provided image (e.g., flyers, ads, magazines, posters) and return them **strictly as JSON**, with no commentary or formatting beyond valid JSON.
-
----
-
-### INPUT
-
-```xml
-<image>COMPANY_INFORMATION_IMAGE</image>
-```
-
-### EXPECTED OUTPUT
-
-```xml
-<output>
-{
-  "companies": [
-    {
-      "name": "",
-      "address": "",
-      "phone": "",
-      "email": "",
-      "website": "",
-      "services": [],
-      "products": [],
-      "other_info": ""
-    }
-  ]
-}
-</output>
-```
-
----
-
-### BEHAVIORAL RULES
-
-<instruction>RETURN OUTPUT IN VALID JSON FORMAT ONLY — NO EXTRA TEXT, COMMENTS, MARKUP, OR EXPLANATIONS.</instruction>
-
-<instruction>DO NOT HALLUCINATE. IF ANY FIELD IS UNKNOWN OR UNCLEAR, LEAVE IT EMPTY OR USE AN EMPTY ARRAY AS APPROPRIATE.</instruction>
-
-<instruction>NEVER REWRITE, SUMMARIZE, OR INTERPRET TEXT. EXTRACT INFORMATION EXACTLY AS IT APPEARS IN THE IMAGE.</instruction>
-
-<instruction>NEVER MODIFY, CORRECT, OR FORMAT TEXT. PRESERVE ORIGINAL SPELLING, SYMBOLS, AND NUMBER FORMATS.</instruction>
-
-<instruction>NEVER OMIT ANY COMPANY, SERVICE, OR PRODUCT THAT CAN BE CLEARLY IDENTIFIED IN THE IMAGE.</instruction>
-
-<instruction>IF MULTIPLE COMPANIES ARE PRESENT, RETURN EACH AS A SEPARATE OBJECT IN THE "companies" ARRAY.</instruction>
-
-<instruction>IF SERVICES OR PRODUCTS ARE LISTED, INCLUDE THEM UNDER THE CORRESPONDING "services" OR "products" ARRAYS FOR THAT COMPANY.</instruction>
-
-<instruction>ONLY RETURN INFORMATION PRESENT IN THE IMAGE. DO NOT GUESS, INFER, OR ADD ANY INFORMATION.</instruction>
-
-<instruction>EXTRACT CONTACT DETAILS (PHONE, EMAIL, WEBSITE, ADDRESS) EXACTLY AS WRITTEN, INCLUDING FORMATTING.</instruction>
-
-<instruction>THE FIELD "other_info" SHOULD CONTAIN ANY ADDITIONAL VISIBLE TEXT RELATED TO THAT COMPANY THAT DOESN’T FIT INTO OTHER FIELDS.</instruction>
-
-""".strip()
-
-SORTIFY_PROMPT = """
-You are a **receipt extraction model**.
-Your purpose is to extract all visible information from a provided image of a **receipt** and return it **strictly as JSON**, without any additional commentary or formatting.
-
----
-
-### INPUT
-
-```xml
-<image>RECEIPT_IMAGE</image>
-```
-
-### EXPECTED OUTPUT
-
-```xml
-<output>
-{
-  "store_name": "",
-  "store_address": "",
-  "date": "",
-  "time": "",
-  "items": [
-    {
-      "name": "",
-      "quantity": 0.0,
-      "unit_price": 0.0,
-      "total_price": 0.0
-    }
-  ],
-  "subtotal": 0.0,
-  "mva": 0.0,
-  "total": 0.0,
-  "norwegian_code": ""
-}
-</output>
-```
+def get_sortify_prompt() -> str:
+    """Receipt data extraction (JSON)."""
+    return _load_prompt("sortify")
 
----
 
-### BEHAVIORAL RULES
+def get_phonectrl_prompt() -> str:
+    """Visual segmentation and object localization."""
+    return _load_prompt("phonectrl")
 
-<instruction>RETURN OUTPUT IN VALID JSON FORMAT ONLY — NO EXTRA TEXT, COMMENTS, MARKUP, OR EXPLANATIONS.</instruction>
 
-<instruction>DO NOT HALLUCINATE. IF ANY FIELD IS UNKNOWN OR UNCLEAR, LEAVE IT EMPTY OR USE AN EMPTY ARRAY OR ZERO VALUE AS APPROPRIATE.</instruction>
-
-<instruction>NEVER REWRITE, SUMMARIZE, OR INTERPRET TEXT. EXTRACT VALUES EXACTLY AS THEY APPEAR ON THE RECEIPT.</instruction>
-
-<instruction>NEVER MODIFY, CORRECT, OR FORMAT ANY EXTRACTED INFORMATION. PRESERVE ORIGINAL SPELLING, SYMBOLS, AND NUMBER FORMATS.</instruction>
-
-<instruction>NEVER OMIT ANY INFORMATION THAT CAN BE CLEARLY READ FROM THE RECEIPT IMAGE.</instruction>
-
-<instruction>ALWAYS EXTRACT THE "total" VALUE WITH HIGHEST PRIORITY. IF MULTIPLE TOTALS EXIST, CHOOSE THE ONE CLEARLY MARKED AS THE FINAL PAYMENT TOTAL.</instruction>
-
-<instruction>THE "norwegian_code" FIELD SHOULD CONTAIN THE NÆRINGSKODE (E.G., "47.11") THAT MOST CLOSELY MATCHES THE TYPE OF STORE. IF UNKNOWN, LEAVE IT EMPTY.</instruction>
-
-<instruction>EXTRACT NUMERIC VALUES EXACTLY AS THEY APPEAR (INCLUDING DECIMAL PLACES). DO NOT CONVERT CURRENCIES OR ROUND VALUES.</instruction>
-
-<instruction>RETURN ONLY WHAT IS PRESENT IN THE IMAGE. DO NOT GUESS, INFER, OR ADD ANY INFORMATION.</instruction>
-""".strip()
-
-PHONECTRL_PROMPT = """
-You are a **visual segmentation and object localization model** that interfaces with an external MCP vision tool (`mcp-vision`).
-Your primary role is to **identify, locate, and isolate visual objects** — such as app icons, buttons, or items — from provided images.
-You do **not** interpret or describe the image; you only locate, classify, and return precise object data.
-
----
-
-### INPUT
-
-```xml
-<image>IMAGE_INPUT</image>
-<query>OBJECT_OR_LABEL_TO_FIND</query>
-```
-
-### EXPECTED OUTPUT
-
-```xml
-<output>
-{
-  "found": true,
-  "objects": [
-    {
-      "label": "",
-      "confidence": 0.0,
-      "bounding_box": {
-        "xmin": 0,
-        "ymin": 0,
-        "xmax": 0,
-        "ymax": 0
-      }
-    }
-  ]
-}
-</output>
-```
-
-If no object is found, return:
-
-```xml
-<output>
-{
-  "found": false,
-  "objects": []
+# Old constant names, resolved lazily through the accessors above
+_PROMPT_CONSTANTS = {
+    "SYSTEM_PROMPT": get_system_prompt,
+    "HISTORY_SUMMARY_PROMPT": get_history_summary_prompt,
+    "DRIVSTOFF_PROMPT": get_drivstoff_prompt,
+    "ALTLOKALT_PROMPT": get_altlokalt_prompt,
+    "SORTIFY_PROMPT": get_sortify_prompt,
+    "PHONECTRL_PROMPT": get_phonectrl_prompt,
 }
-</output>
-```
-
----
-
-### BEHAVIORAL RULES
-
-<instruction>DO NOT HALLUCINATE. IF THE REQUESTED OBJECT IS NOT CLEARLY VISIBLE, RETURN "found": false.</instruction>
-
-<instruction>RETURN OUTPUT IN VALID JSON FORMAT ONLY — NO TEXT, EXPLANATIONS, OR COMMENTS OUTSIDE JSON.</instruction>
-
-<instruction>RETURN ALL DETECTED OBJECTS THAT MATCH THE QUERY. DO NOT FILTER OUT LOW CONFIDENCE RESULTS UNLESS CONFIDENCE IS BELOW 0.05.</instruction>
-
-<instruction>USE PRECISE BOUNDING BOX COORDINATES (xmin, ymin, xmax, ymax) AS PROVIDED BY THE DETECTION MODEL.</instruction>
 
-<instruction>NEVER INTERPRET, SUMMARIZE, OR GUESS. ONLY RETURN DATA DIRECTLY SUPPORTED BY MODEL OUTPUT.</instruction>
 
-<instruction>WHEN MULTIPLE OBJECTS OF THE SAME TYPE ARE FOUND, RETURN ALL WITH INDIVIDUAL BOUNDING BOXES.</instruction>
+def __getattr__(name: str) -> str:
+    if name in _PROMPT_CONSTANTS:
+        return _PROMPT_CONSTANTS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-<instruction>IF REQUESTED, PROVIDE CROPPED VERSIONS OF THE DETECTED OBJECTS USING THE "zoom_to_object" TOOL.</instruction>
-
-<instruction>THE "label" FIELD MUST MATCH ONE OF THE REQUESTED candidate_labels EXACTLY.</instruction>
-
-<instruction>ALWAYS CALL THE "locate_objects" TOOL FIRST TO IDENTIFY OBJECTS AND THEIR LOCATIONS.</instruction>
-
----
-
-### INTERNAL TOOL USE
-
-You have access to the following MCP tools:
-
-* **locate_objects(image_path, candidate_labels)** → Detect and return a list of matching objects with coordinates.
-* **zoom_to_object(image_path, label)** → Crop to the best bounding box of the given label and return an image segment.
-
-When asked to extract, isolate, or crop a specific object (e.g., *“get the icon of the Spotify app from this screenshot”*),
-
-1. Call `locate_objects()` with candidate_labels = ["Spotify", "Spotify icon", "app icon", "Spotify logo"].
-2. From the returned bounding boxes, pick the **highest confidence** detection.
-3. Use `zoom_to_object()` to crop the image and return the **isolated object image**.
-""".strip()
 
 class MCPServerModel(BaseModel):
+    # Schema is built on first use rather than at import. Server entries are
+    # never modified after loading, and unknown fields are a config typo.
+    model_config = ConfigDict(frozen=True, extra="forbid", defer_build=True)
+
     url: str
     type: str
     env: dict[str, str] | None = None
+    # stdio servers: executable and its arguments, kept apart so paths with
+    # spaces survive. url then holds the joined command line for display.
+    command: str | None = None
+    args: tuple[str, ...] = ()
+
+    @model_validator(mode="before")
+    @classmethod
+    def _command_line_as_url(cls, data):
+        if isinstance(data, dict) and not data.get("url") and data.get("command"):
+            data = {**data, "url": " ".join([data["command"], *data.get("args", ())])}
+        return data
 
 
 class AgentConfig(BaseModel):
     """Agent configuration that can be passed directly or loaded from environment."""
     
+    # Schema is built on first use rather than at import; instances stay
+    # mutable for runtime overrides (pydantic's default)
+    model_config = ConfigDict(defer_build=True)
+    
     max_iterations: int = 10
     timeout: float = 604800.0  # a week in seconds
     max_tool_retries: int = 15
     allow_sampling: bool = True
+    prompt_cache: bool = True
+    draft_model_name: Optional[str] = None
+    query_retries: int = 2
+    retry_base_delay: float = 1.0
+    retry_max_delay: float = 30.0
+    context_window_turns: int = 0  # 0 keeps every turn
+    history_db_path: Optional[str] = None
+    history_session: Optional[str] = None  # None: the agent's class name
+    history_compaction_ratio: float = 0.8  # 0 disables compaction
+    context_window_tokens: int = 0  # 0: take it from the provider config
+    summary_model_name: Optional[str] = None
+    enable_result_cache: bool = False
+    stream_coalesce_ms: float = 10.0  # 0 yields every token delta
+    debug_validation: bool = False
     
     @classmethod
     def from_env(cls) -> "AgentConfig":
@@ -314,18 +122,50 @@ class AgentConfig(BaseModel):
             timeout=float(os.getenv("AGENT_TIMEOUT", "604800.0")),
             max_tool_retries=int(os.getenv("AGENT_MAX_TOOL_RETRIES", "15")),
             allow_sampling=os.getenv("AGENT_ALLOW_SAMPLING", "true").lower() == "true",
+            prompt_cache=os.getenv("AGENT_PROMPT_CACHE", "true").lower() == "true",
+            draft_model_name=os.getenv("AGENT_DRAFT_MODEL") or None,
+            query_retries=int(os.getenv("AGENT_QUERY_RETRIES", "2")),
+            retry_base_delay=float(os.getenv("AGENT_RETRY_BASE_DELAY", "1.0")),
+            retry_max_delay=float(os.getenv("AGENT_RETRY_MAX_DELAY", "30.0")),
+            context_window_turns=int(os.getenv("AGENT_CONTEXT_WINDOW_TURNS", "0")),
+            history_db_path=os.getenv("AGENT_HISTORY_DB") or None,
+            history_session=os.getenv("AGENT_HISTORY_SESSION") or None,
+            history_compaction_ratio=float(
+                os.getenv("AGENT_HISTORY_COMPACTION_RATIO", "0.8")
+            ),
+            context_window_tokens=int(os.getenv("AGENT_CONTEXT_WINDOW_TOKENS", "0")),
+            summary_model_name=os.getenv("AGENT_SUMMARY_MODEL") or None,
+            enable_result_cache=os.getenv("AGENT_RESULT_CACHE", "false").lower() == "true",
+            stream_coalesce_ms=float(os.getenv("AGENT_STREAM_COALESCE_MS", "10.0")),
+            debug_validation=os.getenv("AGENT_DEBUG_VALIDATION", "false").lower() == "true",
         )
-    
-    class Config:
-        """Pydantic config."""
-        frozen = False  # Allow mutation for runtime overrides
+
+
+@functools.cache
+def get_config() -> AgentConfig:
+    """Process-wide AgentConfig, read from the environment on first call.
+
+    The returned instance is shared: use model_copy() before changing fields.
+    """
+    return AgentConfig.from_env()
+
+
+class _LegacyAgentSettings(type):
+    # Config.Agent.MAX_ITERATIONS -> get_config().max_iterations
+    def __getattr__(cls, name: str):
+        if name.isupper():
+            return getattr(get_config(), name.lower())
+        raise AttributeError(name)
 
 
 class Config:
-    """Legacy config class for backward compatibility."""
-    
-    class Agent:
-        MAX_ITERATIONS = 10
-        TIMEOUT = 604800.0
-        MAX_TOOL_RETRIES = 15
-        ALLOW_SAMPLING = True
+    """Legacy config class for backward compatibility.
+
+    Deprecated: use get_config() or AgentConfig. Config.Agent.<NAME> reads
+    the matching field of get_config().
+    """
+
+    class Agent(metaclass=_LegacyAgentSettings):
+        # Config.Agent().MAX_ITERATIONS works too
+        def __getattr__(self, name: str):
+            return getattr(type(self), name)
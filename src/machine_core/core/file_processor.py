@@ -8,13 +8,53 @@ Three modes:
 Also handles base64 file decoding and batch processing for HTTP upload workflows.
 """
 
+import asyncio
 import base64
 import io
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Union
+from urllib.parse import urlsplit
 from dataclasses import dataclass, field
 from loguru import logger
 
+try:
+    # SIMD (AVX2/SSE4.1/NEON) base64; several times faster on large images
+    import pybase64 as _b64codec
+except ImportError:
+    _b64codec = base64
+
+# Data URL image format ("image/<fmt>") by file extension and by content-type
+_EXT_TO_FMT = {
+    "png": "png",
+    "jpg": "jpeg",
+    "jpeg": "jpeg",
+    "gif": "gif",
+    "webp": "webp",
+}
+_CT_TO_FMT = {
+    "image/png": "png",
+    "image/jpeg": "jpeg",
+    "image/jpg": "jpeg",
+    "image/gif": "gif",
+    "image/webp": "webp",
+}
+
+_EXT_TO_MIME = {
+    ".pdf": "application/pdf",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".bmp": "image/bmp",
+    ".tiff": "image/tiff",
+    ".tif": "image/tiff",
+    ".txt": "text/plain",
+    ".csv": "text/csv",
+    ".log": "text/plain",
+    ".md": "text/plain",
+}
+
 
 @dataclass
 class ProcessedFile:
@@ -78,7 +118,9 @@ class FileProcessor:
             return ""
 
     @staticmethod
-    async def prepare_for_vlm(image_source: Union[str, Path]) -> Optional[str]:
+    async def prepare_for_vlm(
+        image_source: Union[str, Path], http_client: Optional[Any] = None
+    ) -> Optional[str]:
         """Prepare an image as a data URL for vision language models.
 
         Handles three input types:
@@ -88,6 +130,9 @@ class FileProcessor:
 
         Args:
             image_source: Path, URL, or data URL of the image
+            http_client: Optional shared httpx.AsyncClient for URL fetches, so
+                repeated fetches reuse pooled connections. A temporary client
+                is created (and closed) when omitted.
 
         Returns:
             data URL string (e.g., "data:image/png;base64,...") or None
@@ -107,20 +152,52 @@ class FileProcessor:
             try:
                 import httpx
 
-                async with httpx.AsyncClient() as http_client:
-                    response = await http_client.get(image_source)
-                    response.raise_for_status()
-                    image_bytes = response.content
+                owns_client = http_client is None
+                if owns_client:
+                    http_client = httpx.AsyncClient(follow_redirects=True)
+                try:
+                    async with http_client.stream("GET", image_source) as response:
+                        response.raise_for_status()
 
-                    content_type = response.headers.get("content-type", "")
-                    img_format = FileProcessor._detect_image_format(
-                        content_type, image_source
-                    )
+                        content_type = response.headers.get("content-type", "")
+                        img_format = FileProcessor._detect_image_format(
+                            content_type, image_source
+                        )
 
-                    encoded_image = base64.b64encode(image_bytes).decode("utf-8")
-                    data_url = f"data:image/{img_format};base64,{encoded_image}"
+                        # Encode as the body arrives into one buffer sized
+                        # from Content-Length, so the raw body is never held
+                        # whole; peak is the encoded buffer plus the final
+                        # string. Chunks are cut to a multiple of 3 bytes so
+                        # the base64 pieces concatenate without padding.
+                        prefix = f"data:image/{img_format};base64,".encode("ascii")
+                        length = response.headers.get("content-length", "")
+                        expected = int(length) if length.isdigit() else 0
+                        buf = bytearray(len(prefix) + 4 * -(-expected // 3))
+                        buf[: len(prefix)] = prefix
+                        pos = len(prefix)
+                        tail = b""
+                        async for chunk in response.aiter_bytes(chunk_size=65_536):
+                            chunk = tail + chunk
+                            cut = len(chunk) - len(chunk) % 3
+                            tail = chunk[cut:]
+                            encoded = _b64codec.b64encode(chunk[:cut])
+                            # Slice assignment grows buf if the header was
+                            # short (e.g. a compressed transfer)
+                            buf[pos : pos + len(encoded)] = encoded
+                            pos += len(encoded)
+                        if tail:
+                            encoded = _b64codec.b64encode(tail)
+                            buf[pos : pos + len(encoded)] = encoded
+                            pos += len(encoded)
+                        del buf[pos:]
+
+                    data_url = buf.decode("ascii")
+                    del buf
                     logger.info("Fetched and encoded image from URL")
                     return data_url
+                finally:
+                    if owns_client:
+                        await http_client.aclose()
             except Exception as e:
                 logger.error(f"Failed to fetch image: {e}")
                 raise
@@ -131,14 +208,10 @@ class FileProcessor:
             if not image_path.exists():
                 raise FileNotFoundError(f"Image file not found: {image_source}")
 
-            with open(image_path, "rb") as f:
-                encoded_image = base64.b64encode(f.read()).decode("utf-8")
-
-            img_format = image_path.suffix.lstrip(".") or "png"
-            if img_format == "jpg":
-                img_format = "jpeg"
-
-            data_url = f"data:image/{img_format};base64,{encoded_image}"
+            # Read + encode in a worker thread so large images don't block the loop
+            data_url = await asyncio.to_thread(
+                FileProcessor._encode_file_sync, image_path
+            )
             logger.info("Encoded local image to base64")
             return data_url
         except Exception as e:
@@ -178,12 +251,7 @@ class FileProcessor:
 
                 # Also prepare for VLM
                 try:
-                    with open(file_path, "rb") as f:
-                        encoded = base64.b64encode(f.read()).decode("utf-8")
-                    img_format = file_path.suffix.lstrip(".") or "png"
-                    if img_format == "jpg":
-                        img_format = "jpeg"
-                    result.data_url = f"data:image/{img_format};base64,{encoded}"
+                    result.data_url = FileProcessor._encode_file_sync(file_path)
                 except Exception as e:
                     logger.warning(f"Could not prepare image for VLM: {e}")
 
@@ -468,40 +536,32 @@ class FileProcessor:
     # Utilities
     # ========================================================================
 
+    @staticmethod
+    def _b64(data: bytes) -> str:
+        """Base64-encode bytes to an ASCII string."""
+        return _b64codec.b64encode(data).decode("ascii")
+
+    @staticmethod
+    def _encode_file_sync(image_path: Path) -> str:
+        """Read a local image and return it as a data URL (blocking)."""
+        with open(image_path, "rb") as f:
+            encoded_image = FileProcessor._b64(f.read())
+
+        suffix = image_path.suffix[1:].lower()
+        img_format = _EXT_TO_FMT.get(suffix, suffix or "png")
+
+        return f"data:image/{img_format};base64,{encoded_image}"
+
     @staticmethod
     def _guess_mime_type(file_path: Path) -> str:
         """Guess MIME type from file extension."""
-        suffix = file_path.suffix.lower()
-        mime_map = {
-            ".pdf": "application/pdf",
-            ".png": "image/png",
-            ".jpg": "image/jpeg",
-            ".jpeg": "image/jpeg",
-            ".gif": "image/gif",
-            ".webp": "image/webp",
-            ".bmp": "image/bmp",
-            ".tiff": "image/tiff",
-            ".tif": "image/tiff",
-            ".txt": "text/plain",
-            ".csv": "text/csv",
-            ".log": "text/plain",
-            ".md": "text/plain",
-        }
-        return mime_map.get(suffix, "application/octet-stream")
+        return _EXT_TO_MIME.get(file_path.suffix.lower(), "application/octet-stream")
 
     @staticmethod
     def _detect_image_format(content_type: str, url: str) -> str:
         """Detect image format from content-type header or URL."""
-        if "png" in content_type or url.endswith(".png"):
-            return "png"
-        elif (
-            "jpeg" in content_type
-            or "jpg" in content_type
-            or url.endswith((".jpg", ".jpeg"))
-        ):
-            return "jpeg"
-        elif "gif" in content_type or url.endswith(".gif"):
-            return "gif"
-        elif "webp" in content_type or url.endswith(".webp"):
-            return "webp"
-        return "png"  # default
+        fmt = _CT_TO_FMT.get(content_type.split(";", 1)[0].strip().lower())
+        if fmt:
+            return fmt
+        suffix = Path(urlsplit(url).path).suffix[1:].lower()
+        return _EXT_TO_FMT.get(suffix, "png")  # png is the default
@@ -0,0 +1,164 @@
+"""Append-only SQLite log of conversation turns.
+
+AgentCore keeps only a sliding window of recent turns in memory (what gets
+sent to the provider). When a history database is configured, every turn is
+also appended here so the full conversation survives restarts and the window
+can be rebuilt from disk on demand.
+
+Several agents (and processes) can share one database file: each store
+writes to its own session, and turn numbers are assigned by SQLite inside
+the insert transaction rather than counted in memory.
+
+Usage:
+    store = HistoryStore("history.db", session="support-bot")
+    store.append_turn(result.new_messages())
+    recent = store.load_turns(limit=20)  # list of turns, oldest first
+"""
+
+import queue
+import sqlite3
+import threading
+from typing import List, Optional
+
+from loguru import logger
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter
+
+
+class HistoryStore:
+    """SQLite-backed, append-only store of message turns for one session.
+
+    A turn is the list of messages produced by one agent run (the user
+    request, any tool calls/returns, and the final response). Each message
+    is stored as its own row, serialized with pydantic-ai's message adapter.
+
+    Writes are handed to a background thread, so append_turn() never blocks
+    the event loop on serialization or a disk commit. Reads wait for pending
+    writes first.
+    """
+
+    def __init__(self, path: str, session: str = "default"):
+        """Open (or create) the history database.
+
+        Args:
+            path: SQLite database path, or ":memory:"
+            session: Conversation this store reads and writes; other
+                sessions in the same file are never touched
+        """
+        self.path = path
+        self.session = session
+        self._lock = threading.Lock()
+        # Autocommit mode: append transactions are opened explicitly
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=30.0
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "session TEXT NOT NULL DEFAULT '', turn INTEGER NOT NULL, "
+            "role TEXT NOT NULL, payload BLOB NOT NULL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(messages)")}
+        if "session" not in columns:
+            # Databases written before sessions existed: their turns land in ''
+            self._conn.execute(
+                "ALTER TABLE messages ADD COLUMN session TEXT NOT NULL DEFAULT ''"
+            )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS messages_session_turn "
+            "ON messages (session, turn)"
+        )
+
+        self._pending: "queue.Queue[Optional[List[ModelMessage]]]" = queue.Queue()
+        self._writer = threading.Thread(
+            target=self._write_loop, name=f"history-store:{session}", daemon=True
+        )
+        self._writer.start()
+        logger.debug(f"History store at {path}, session {session!r}")
+
+    def append_turn(self, messages: List[ModelMessage]):
+        """Queue one turn's messages to be appended to the log."""
+        if not messages:
+            return
+        self._pending.put(list(messages))
+
+    def flush(self):
+        """Block until every queued turn has been written."""
+        self._pending.join()
+
+    def load_turns(self, limit: Optional[int] = None) -> List[List[ModelMessage]]:
+        """Load the session's most recent turns, oldest first.
+
+        Args:
+            limit: Number of turns to load. None or 0 loads every turn.
+        """
+        self.flush()
+        with self._lock:
+            if limit:
+                rows = self._conn.execute(
+                    "SELECT turn, payload FROM messages WHERE session = ? AND turn > "
+                    "(SELECT MAX(turn) FROM messages WHERE session = ?) - ? "
+                    "ORDER BY turn, rowid",
+                    (self.session, self.session, limit),
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT turn, payload FROM messages WHERE session = ? "
+                    "ORDER BY turn, rowid",
+                    (self.session,),
+                ).fetchall()
+
+        turns: List[List[ModelMessage]] = []
+        current_turn = None
+        for turn, payload in rows:
+            if turn != current_turn:
+                turns.append([])
+                current_turn = turn
+            turns[-1].extend(ModelMessagesTypeAdapter.validate_json(payload))
+        return turns
+
+    def close(self):
+        """Write any queued turns and close the database connection."""
+        if self._writer.is_alive():
+            self._pending.put(None)
+            self._writer.join()
+        with self._lock:
+            self._conn.close()
+
+    def _write_loop(self):
+        """Background writer: append queued turns in order until close()."""
+        while True:
+            messages = self._pending.get()
+            try:
+                if messages is None:
+                    return
+                self._insert_turn(messages)
+            except Exception as e:
+                logger.error(f"Could not append turn to {self.path}: {e}")
+            finally:
+                self._pending.task_done()
+
+    def _insert_turn(self, messages: List[ModelMessage]):
+        """Insert one turn under the session's next turn number.
+
+        BEGIN IMMEDIATE takes the write lock before reading MAX(turn), so
+        concurrent writers (other stores, other processes) can't claim the
+        same number.
+        """
+        rows = [
+            (msg.kind, ModelMessagesTypeAdapter.dump_json([msg])) for msg in messages
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                (turn,) = self._conn.execute(
+                    "SELECT COALESCE(MAX(turn), -1) + 1 FROM messages WHERE session = ?",
+                    (self.session,),
+                ).fetchone()
+                self._conn.executemany(
+                    "INSERT INTO messages (session, turn, role, payload) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(self.session, turn, role, payload) for role, payload in rows],
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
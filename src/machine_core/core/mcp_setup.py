@@ -1,12 +1,35 @@
 """MCP server configuration and validation utilities."""
 
+import asyncio
+import hashlib
 import json
 import os
+import threading
+import weakref
+from collections import OrderedDict
 from pathlib import Path
+
+import httpx
 from loguru import logger
 from pydantic_ai.mcp import MCPServerSSE, MCPServerStreamableHTTP, MCPServerStdio
 from pydantic_ai.toolsets import AbstractToolset
 
+try:
+    import orjson
+
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers
+    # only need to catch the latter
+    _loads = orjson.loads
+
+    def _manifest_bytes(manifest) -> bytes:
+        return orjson.dumps(manifest, option=orjson.OPT_SORT_KEYS, default=str)
+
+except ImportError:
+    _loads = json.loads
+
+    def _manifest_bytes(manifest) -> bytes:
+        return json.dumps(manifest, sort_keys=True, default=str).encode()
+
 
 class ToolFilterWrapper(AbstractToolset):
     """Wraps an MCP toolset and filters out problematic tools on-the-fly.
@@ -97,6 +120,87 @@ class ToolFilterWrapper(AbstractToolset):
         return await self.wrapped_toolset.call_tool(name, tool_args, ctx, tool)
 
 
+def _bad_prop(prop_def: dict) -> str | None:
+    """Return why a schema property is unusable, or None if it is fine.
+
+    A missing, null, empty-string or empty-list type all count; the last is
+    what Optional[str] parameters turn into on some MCP servers.
+    """
+    if not prop_def.get("type"):
+        return "missing/empty type"
+    return None
+
+
+def _schema_issues(tools: list) -> tuple[frozenset[str], list[str]]:
+    """Walk tool input schemas; return (problematic tool names, issue lines)."""
+    problematic_tools = set()
+    issues_found = []
+
+    for tool in tools:
+        # Lazy debug logging: schemas can be large and this loop runs per
+        # tool and per property, so skip formatting unless DEBUG is on
+        logger.opt(lazy=True).debug("Checking tool: {}", lambda: tool.name)
+        if hasattr(tool, "inputSchema") and tool.inputSchema:
+            schema = tool.inputSchema
+            logger.opt(lazy=True).debug(
+                "Tool {} schema: {}", lambda: tool.name, lambda: schema
+            )
+
+            # Check for properties with empty Type arrays
+            if "properties" in schema:
+                tool_has_issues = False
+                for prop_name, prop_def in schema["properties"].items():
+                    logger.opt(lazy=True).debug(
+                        "  Property {}: {}",
+                        lambda: prop_name,
+                        lambda: prop_def,
+                    )
+                    issue = _bad_prop(prop_def)
+                    if issue:
+                        issues_found.append(f"  {tool.name}.{prop_name}: {issue}")
+                        logger.debug(f"    ❌ {issue}")
+                        tool_has_issues = True
+
+                if tool_has_issues:
+                    problematic_tools.add(tool.name)
+        else:
+            logger.opt(lazy=True).debug(
+                "Tool {} has no inputSchema", lambda: tool.name
+            )
+
+    return frozenset(problematic_tools), issues_found
+
+
+# tool manifest digest -> _schema_issues() result, least recently used first
+_SCHEMA_ISSUES_CACHE: "OrderedDict[bytes, tuple[frozenset[str], list[str]]]" = (
+    OrderedDict()
+)
+_SCHEMA_ISSUES_CACHE_SIZE = 64
+
+
+def _cached_schema_issues(tools: list) -> tuple[frozenset[str], list[str]]:
+    """_schema_issues() memoized on the JSON dump of the tool schemas.
+
+    Servers usually publish a static manifest, so a rebuilt agent or a second
+    config listing the same server skips the walk and its per-property
+    logging. The dump covers names and schemas, so a changed schema is a miss.
+    """
+    manifest = [(tool.name, getattr(tool, "inputSchema", None)) for tool in tools]
+    digest = hashlib.blake2b(_manifest_bytes(manifest), digest_size=16).digest()
+
+    cached = _SCHEMA_ISSUES_CACHE.get(digest)
+    if cached is not None:
+        _SCHEMA_ISSUES_CACHE.move_to_end(digest)
+        logger.debug(f"Reusing schema validation for {len(tools)} tools")
+        return cached[0], list(cached[1])
+
+    problematic_tools, issues_found = _schema_issues(tools)
+    _SCHEMA_ISSUES_CACHE[digest] = (problematic_tools, list(issues_found))
+    if len(_SCHEMA_ISSUES_CACHE) > _SCHEMA_ISSUES_CACHE_SIZE:
+        _SCHEMA_ISSUES_CACHE.popitem(last=False)
+    return problematic_tools, issues_found
+
+
 async def validate_and_fix_toolsets(toolsets: list) -> tuple[list, list[str]]:
     """Validate MCP toolsets and filter problematic tools.
 
@@ -112,13 +216,25 @@ async def validate_and_fix_toolsets(toolsets: list) -> tuple[list, list[str]]:
     validated_toolsets = []
     all_warnings = []
 
+    # List tools from every server concurrently; startup then waits on the
+    # slowest server instead of the sum of all of them.
+    listable = [ts for ts in toolsets if hasattr(ts, "list_tools")]
+    responses = await asyncio.gather(
+        *(ts.list_tools() for ts in listable), return_exceptions=True
+    )
+    listed = {id(ts): response for ts, response in zip(listable, responses)}
+
     for toolset in toolsets:
         try:
             # Get tools from the toolset to validate their schemas
-            if hasattr(toolset, "list_tools"):
-                tools_response = await toolset.list_tools()
-                logger.debug(
-                    f"tools_response type: {type(tools_response)}, value: {tools_response}"
+            if id(toolset) in listed:
+                tools_response = listed[id(toolset)]
+                if isinstance(tools_response, BaseException):
+                    raise tools_response
+                logger.opt(lazy=True).debug(
+                    "tools_response type: {}, value: {}",
+                    lambda: type(tools_response),
+                    lambda: tools_response,
                 )
 
                 # Handle different response formats
@@ -133,47 +249,11 @@ async def validate_and_fix_toolsets(toolsets: list) -> tuple[list, list[str]]:
                     f"Validating {len(tools)} tools from {toolset.__class__.__name__}"
                 )
 
-                # Check each tool's schema and collect problematic tool names
-                problematic_tools = set()
-                issues_found = []
-
-                for tool in tools:
-                    logger.debug(f"Checking tool: {tool.name}")
-                    if hasattr(tool, "inputSchema") and tool.inputSchema:
-                        schema = tool.inputSchema
-                        logger.debug(f"Tool {tool.name} schema: {schema}")
-
-                        # Check for properties with empty Type arrays
-                        if "properties" in schema:
-                            tool_has_issues = False
-                            for prop_name, prop_def in schema["properties"].items():
-                                logger.debug(f"  Property {prop_name}: {prop_def}")
-                                # Check if type is missing or empty
-                                if "type" not in prop_def or not prop_def["type"]:
-                                    issues_found.append(
-                                        f"  {tool.name}.{prop_name}: missing/empty type"
-                                    )
-                                    logger.debug(f"    ❌ Missing/empty type!")
-                                    tool_has_issues = True
-                                # Check if type is an empty array
-                                elif (
-                                    isinstance(prop_def["type"], list)
-                                    and len(prop_def["type"]) == 0
-                                ):
-                                    issues_found.append(
-                                        f"  {tool.name}.{prop_name}: empty type array"
-                                    )
-                                    logger.debug(f"    ❌ Empty type array!")
-                                    tool_has_issues = True
-
-                            if tool_has_issues:
-                                problematic_tools.add(tool.name)
-                    else:
-                        logger.debug(f"Tool {tool.name} has no inputSchema")
+                problematic_tools, issues_found = _cached_schema_issues(tools)
 
                 if problematic_tools:
                     # Wrap the toolset to filter out problematic tools
-                    wrapped_toolset = ToolFilterWrapper(toolset, problematic_tools)
+                    wrapped_toolset = ToolFilterWrapper(toolset, set(problematic_tools))
                     validated_toolsets.append(wrapped_toolset)
 
                     warning_msg = (
@@ -241,6 +321,45 @@ async def validate_and_fix_toolsets(toolsets: list) -> tuple[list, list[str]]:
     return validated_toolsets, all_warnings
 
 
+# config path -> (st_mtime_ns, st_size, content digest)
+_MCP_CONFIG_DIGESTS: dict[str, tuple[int, int, bytes]] = {}
+# content digest -> parsed MCPServerModel list, least recently used first.
+# Bounded so a worker whose mcp.json keeps changing doesn't keep every version.
+_MCP_SERVERS_CACHE: "OrderedDict[bytes, list]" = OrderedDict()
+_MCP_SERVERS_CACHE_SIZE = 8
+
+
+def _read_config_digest(config_path: str) -> tuple[bytes | None, bytes | None]:
+    """Return (digest, raw bytes) for an MCP config file.
+
+    The file is only re-read when its mtime or size changed; in that case the
+    raw bytes are returned too, otherwise raw is None. digest is None if the
+    file does not exist.
+    """
+    try:
+        st = os.stat(config_path)
+    except FileNotFoundError:
+        _MCP_CONFIG_DIGESTS.pop(config_path, None)
+        return None, None
+
+    cached = _MCP_CONFIG_DIGESTS.get(config_path)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2], None
+
+    data = Path(config_path).read_bytes()
+    digest = hashlib.blake2b(data, digest_size=16).digest()
+    _MCP_CONFIG_DIGESTS[config_path] = (st.st_mtime_ns, st.st_size, digest)
+    return digest, data
+
+
+def mcp_config_digest(config_path: str = "mcp.json") -> bytes | None:
+    """Content hash of an MCP config file, or None if it does not exist.
+
+    Agents whose config files have the same content can share MCP toolsets.
+    """
+    return _read_config_digest(config_path)[0]
+
+
 def load_mcp_servers_from_config(config_path: str = "mcp.json") -> list:
     """Load MCP server configurations from a JSON file.
 
@@ -260,6 +379,10 @@ def load_mcp_servers_from_config(config_path: str = "mcp.json") -> list:
       "inputs": []  // optional
     }
 
+    Parsed results are cached by file content, so loading the same config
+    again (e.g. for a second agent) skips the read and parse. The file is
+    only re-read when its mtime or size changes.
+
     Args:
         config_path: Path to the mcp.json configuration file
 
@@ -268,17 +391,28 @@ def load_mcp_servers_from_config(config_path: str = "mcp.json") -> list:
     """
     from .config import MCPServerModel
 
-    config_file = Path(config_path)
+    try:
+        digest, data = _read_config_digest(config_path)
+    except Exception as e:
+        logger.error(f"Error loading MCP config: {e}")
+        return []
 
-    if not config_file.exists():
+    if digest is None:
         logger.warning(
             f"MCP config file not found at {config_path}, using empty server list"
         )
         return []
 
+    cached = _MCP_SERVERS_CACHE.get(digest)
+    if cached is not None:
+        _MCP_SERVERS_CACHE.move_to_end(digest)
+        logger.debug(f"Using cached MCP server list for {config_path}")
+        return list(cached)
+
     try:
-        with open(config_file, "r") as f:
-            config_data = json.load(f)
+        if data is None:
+            data = Path(config_path).read_bytes()
+        config_data = _loads(data)
 
         servers = []
         mcp_servers = config_data.get("servers", {})
@@ -287,19 +421,17 @@ def load_mcp_servers_from_config(config_path: str = "mcp.json") -> list:
             transport = server_config.get("type", "http")
 
             if transport == "stdio":
-                # For stdio, construct command from 'command' and 'args' fields
+                # For stdio, keep 'command' and 'args' as separate fields
                 command = server_config.get("command", "")
                 args = server_config.get("args", [])
                 env = server_config.get("env", None)
 
-                # If args exist, join command and args into a single command string
-                if args:
-                    full_command = " ".join([command] + args)
+                if command:
                     servers.append(
-                        MCPServerModel(url=full_command, type="stdio", env=env)
+                        MCPServerModel(
+                            type="stdio", command=command, args=tuple(args), env=env
+                        )
                     )
-                elif command:
-                    servers.append(MCPServerModel(url=command, type="stdio", env=env))
                 else:
                     logger.warning(f"Server {server_name} missing command, skipping")
             else:
@@ -311,7 +443,10 @@ def load_mcp_servers_from_config(config_path: str = "mcp.json") -> list:
                     logger.warning(f"Server {server_name} missing url, skipping")
 
         logger.info(f"Loaded {len(servers)} MCP server(s) from {config_path}")
-        return servers
+        _MCP_SERVERS_CACHE[digest] = servers
+        if len(_MCP_SERVERS_CACHE) > _MCP_SERVERS_CACHE_SIZE:
+            _MCP_SERVERS_CACHE.popitem(last=False)
+        return list(servers)
 
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse {config_path}: {e}")
@@ -321,6 +456,126 @@ def load_mcp_servers_from_config(config_path: str = "mcp.json") -> list:
         return []
 
 
+# event loop -> {(timeout, read_timeout): shared client for streamable-HTTP
+# MCP servers}. httpx connection pools belong to the loop that opened them,
+# so each loop gets its own clients; entries go away with their loop.
+_HTTP_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = (
+    weakref.WeakKeyDictionary()
+)
+_HTTP_CLIENTS_LOCK = threading.Lock()
+
+
+def _get_http_client(timeout: float, read_timeout: float) -> httpx.AsyncClient:
+    """Shared httpx client for streamable-HTTP MCP servers on the running loop.
+
+    Without it every server session opens its own client, so servers on the
+    same host never share connections or TLS sessions. Callers that use a
+    fresh event loop per request (Streamlit) get a fresh client on it rather
+    than connections left over from a closed loop.
+    """
+    loop = asyncio.get_running_loop()
+    key = (timeout, read_timeout)
+    with _HTTP_CLIENTS_LOCK:
+        clients = _HTTP_CLIENTS.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None or client.is_closed:
+            client = clients[key] = httpx.AsyncClient(
+                timeout=httpx.Timeout(timeout, read=read_timeout),
+                limits=httpx.Limits(keepalive_expiry=30.0),
+            )
+        return client
+
+
+async def close_http_clients():
+    """Close the shared MCP HTTP clients of the running event loop."""
+    with _HTTP_CLIENTS_LOCK:
+        clients = _HTTP_CLIENTS.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+
+
+class _SharedClientStreamableHTTP(MCPServerStreamableHTTP):
+    """Streamable-HTTP server that uses the running loop's shared client.
+
+    The client is looked up when a session opens instead of being fixed at
+    construction, so pooled servers work across event loops. Outside a
+    running loop it is None and pydantic-ai falls back to its own client.
+    """
+
+    @property
+    def http_client(self) -> httpx.AsyncClient | None:
+        try:
+            return _get_http_client(self.timeout, self.read_timeout)
+        except RuntimeError:
+            return None
+
+    @http_client.setter
+    def http_client(self, value):
+        # Assigned by MCPServerStreamableHTTP.__init__; the lookup above wins
+        pass
+
+
+def _build_stdio(tool, timeout: float, max_retries: int, allow_sampling: bool):
+    if tool.command is not None:
+        command, args = tool.command, list(tool.args)
+    else:
+        # Only a command line in url: split on whitespace
+        parts = tool.url.split()
+        command = parts[0]
+        args = parts[1:] if len(parts) > 1 else []
+
+    # Server env overrides the inherited process environment
+    env_vars = {**os.environ, **tool.env} if tool.env else None
+
+    server = MCPServerStdio(
+        command,
+        args=args,
+        env=env_vars,
+        timeout=timeout,
+        read_timeout=timeout,
+        max_retries=max_retries,
+        allow_sampling=allow_sampling,
+    )
+    logger.info(
+        f"Added stdio tool: {command} {' '.join(args)} with env vars: {list(tool.env.keys()) if tool.env else 'none'}"
+    )
+    return server
+
+
+def _build_http(tool, timeout: float, max_retries: int, allow_sampling: bool):
+    server = _SharedClientStreamableHTTP(
+        url=tool.url,
+        timeout=timeout,
+        max_retries=max_retries,
+        allow_sampling=allow_sampling,
+        read_timeout=timeout,
+    )
+    logger.info(f"Added http tool: {tool.url}")
+    return server
+
+
+def _build_sse(tool, timeout: float, max_retries: int, allow_sampling: bool):
+    # No shared client: mcp's sse_client closes whatever client it is
+    # handed when the session exits
+    server = MCPServerSSE(
+        url=tool.url,
+        timeout=timeout,
+        max_retries=max_retries,
+        allow_sampling=allow_sampling,
+        read_timeout=timeout,
+    )
+    logger.info(f"Added sse tool: {tool.url}")
+    return server
+
+
+# MCPServerModel.type -> builder(tool, timeout, max_retries, allow_sampling)
+_TOOLSET_BUILDERS = {
+    "stdio": _build_stdio,
+    "http": _build_http,
+    "sse": _build_sse,
+}
+
+
 def setup_mcp_toolsets(
     tools_urls: list,
     timeout: float = 604800.0,
@@ -329,6 +584,11 @@ def setup_mcp_toolsets(
 ) -> list:
     """Set up MCP toolsets from server configurations.
 
+    Each call builds fresh server objects, since they hold live connections.
+    AgentCore shares them between agents through its refcounted toolset pool
+    (keyed by config digest) rather than caching them here. Streamable-HTTP
+    servers share one pooled httpx client per event loop and timeout.
+
     Args:
         tools_urls: List of MCP server configurations
         timeout: Timeout for MCP connections in seconds
@@ -338,52 +598,15 @@ def setup_mcp_toolsets(
     Returns:
         List of configured MCP toolsets
     """
-    type_map = {"sse": MCPServerSSE, "http": MCPServerStreamableHTTP}
     toolsets = []
 
     for tool in tools_urls:
+        builder = _TOOLSET_BUILDERS.get(tool.type)
+        if builder is None:
+            logger.warning(f"Unknown tool type: {tool.type}")
+            continue
         try:
-            if tool.type == "stdio":
-                # Parse command and args from url field
-                parts = tool.url.split()
-                command = parts[0]
-                args = parts[1:] if len(parts) > 1 else []
-
-                # Prepare environment variables
-                env_vars = os.environ.copy() if tool.env else None
-                if env_vars and tool.env:
-                    env_vars.update(tool.env)
-                elif tool.env:
-                    env_vars = tool.env
-
-                stdio_tool = MCPServerStdio(
-                    command,
-                    args=args,
-                    env=env_vars,
-                    timeout=timeout,
-                    read_timeout=timeout,
-                    max_retries=max_retries,
-                    allow_sampling=allow_sampling,
-                )
-
-                toolsets.append(stdio_tool)
-                logger.info(
-                    f"Added stdio tool: {command} {' '.join(args)} with env vars: {list(tool.env.keys()) if tool.env else 'none'}"
-                )
-            else:
-                # Handle http and sse type tools
-                if tool.type in type_map:
-                    server = type_map[tool.type](
-                        url=tool.url,
-                        timeout=timeout,
-                        max_retries=max_retries,
-                        allow_sampling=allow_sampling,
-                        read_timeout=timeout,
-                    )
-                    toolsets.append(server)
-                    logger.info(f"Added {tool.type} tool: {tool.url}")
-                else:
-                    logger.warning(f"Unknown tool type: {tool.type}")
+            toolsets.append(builder(tool, timeout, max_retries, allow_sampling))
         except Exception as e:
             logger.error(f"Failed to setup tool {tool.url}: {e}")
 
@@ -0,0 +1,109 @@
+"""SQLite cache of run_query answers, shared by every agent using the file.
+
+Lives next to the turn log in the history database (AGENT_HISTORY_DB), so
+separate CLI and cron processes asking the same question reuse one answer.
+Without a history database the cache is in memory and per process.
+
+Usage:
+    cache = get_result_cache("history.db")
+    hit = cache.get(key)
+    cache.put(key, result.output, result.new_messages())
+"""
+
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from loguru import logger
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter
+from pydantic_ai.usage import RunUsage
+
+
+@dataclass
+class CachedRunResult:
+    """A cached answer standing in for AgentRunResult (output, messages, usage)."""
+
+    output: str
+    messages: List[ModelMessage] = field(default_factory=list)
+
+    def new_messages(self) -> List[ModelMessage]:
+        return list(self.messages)
+
+    def usage(self) -> RunUsage:
+        # Nothing was sent to the provider
+        return RunUsage()
+
+
+class ResultCache:
+    """Bounded key -> answer table in a SQLite file, oldest entries evicted."""
+
+    def __init__(self, path: str, max_entries: int = 10_000):
+        """Open (or create) the results table.
+
+        Args:
+            path: SQLite database path, or ":memory:"
+            max_entries: Rows kept; the oldest are dropped beyond this
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, created REAL NOT NULL, "
+            "output TEXT NOT NULL, messages BLOB NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS results_created ON results (created)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[CachedRunResult]:
+        """Return the cached answer for key, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT output, messages FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        output, messages = row
+        return CachedRunResult(output, ModelMessagesTypeAdapter.validate_json(messages))
+
+    def put(self, key: str, output: str, messages: List[ModelMessage]):
+        """Store an answer, evicting the oldest rows past max_entries."""
+        payload = ModelMessagesTypeAdapter.dump_json(messages)
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results (key, created, output, messages) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, time.time(), output, payload),
+                )
+                self._conn.execute(
+                    "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results "
+                    "ORDER BY created DESC, rowid DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+
+# One cache per database path for the whole process; ":memory:" in particular
+# has to be a single connection to be shared at all.
+_RESULT_CACHES: dict[str, ResultCache] = {}
+_RESULT_CACHES_LOCK = threading.Lock()
+
+
+def get_result_cache(path: Optional[str]) -> ResultCache:
+    """Process-wide ResultCache for a database path (None: in memory)."""
+    path = path or ":memory:"
+    with _RESULT_CACHES_LOCK:
+        cache = _RESULT_CACHES.get(path)
+        if cache is None:
+            if path == ":memory:":
+                logger.info(
+                    "Result cache is in memory; set AGENT_HISTORY_DB to share "
+                    "it across processes"
+                )
+            cache = _RESULT_CACHES[path] = ResultCache(path)
+        return cache
@@ -0,0 +1,5 @@
+"""Prompt templates shipped with machine_core, one .txt file per prompt.
+
+Read them through the accessors in machine_core.core.config
+(get_system_prompt(), get_sortify_prompt(), ...).
+"""
@@ -4,25 +4,89 @@ Machine Core FastAPI Service
 A robust service for building AI agents with MCP (Model Context Protocol) integration.
 This service provides API endpoints and serves documentation with SEO optimization.
 """
+import hashlib
+import json
+import mimetypes
 import os
 from contextlib import asynccontextmanager
 from pathlib import Path
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, Response
 from loguru import logger
 from prometheus_fastapi_instrumentator import Instrumentator
 
 load_dotenv()
 
+frontend_path = Path(__file__).parent.parent / "frontend"
+SERVE_FRONTEND = os.getenv("MC_SERVE_FRONTEND", "1") == "1"
+
+# Files larger than this are served from disk instead of the in-memory cache
+FRONTEND_CACHE_MAX_BYTES = 5 * 1024 * 1024
+
+# relative path -> (body, etag, content type); body is None for large files
+_frontend_files: dict[str, tuple[bytes | None, str, str]] = {}
+
+
+def _load_frontend(root: Path) -> dict[str, tuple[bytes | None, str, str]]:
+    """Read the frontend into memory once so requests skip stat/open/read."""
+    files = {}
+    for path in root.rglob("*"):
+        if not path.is_file():
+            continue
+        rel = path.relative_to(root).as_posix()
+        content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        if path.stat().st_size > FRONTEND_CACHE_MAX_BYTES:
+            files[rel] = (None, "", content_type)
+            continue
+        data = path.read_bytes()
+        etag = f'"{hashlib.blake2b(data, digest_size=16).hexdigest()}"'
+        files[rel] = (data, etag, content_type)
+    return files
+
+
+async def serve_frontend(path: str, request: Request):
+    """Serve frontend files from memory, with ETag revalidation."""
+    rel = path.strip("/")
+    if rel not in _frontend_files:
+        rel = f"{rel}/index.html" if rel else "index.html"
+    if rel not in _frontend_files and "." not in path.rsplit("/", 1)[-1]:
+        # Extension-less paths are client-side routes of the SPA
+        rel = "index.html"
+    entry = _frontend_files.get(rel)
+    if entry is None:
+        return Response(status_code=404)
+
+    data, etag, content_type = entry
+    if data is None:
+        return FileResponse(frontend_path / rel, media_type=content_type)
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=data, media_type=content_type, headers={"ETag": etag})
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize and cleanup application resources."""
     logger.info("Starting Machine Core API...")
+    instrumentator.expose(app)
+
+    # Frontend last: its catch-all route would otherwise shadow /metrics
+    if not SERVE_FRONTEND:
+        logger.info("Frontend disabled (MC_SERVE_FRONTEND=0)")
+    elif frontend_path.exists():
+        _frontend_files.update(_load_frontend(frontend_path))
+        app.add_api_route(
+            "/{path:path}",
+            serve_frontend,
+            methods=["GET", "HEAD"],
+            include_in_schema=False,
+        )
+        logger.info(f"Serving {len(_frontend_files)} frontend file(s) from {frontend_path}")
+    else:
+        logger.warning(f"Frontend directory not found at {frontend_path}")
     yield
     logger.info("Shutting down Machine Core API...")
 
@@ -42,12 +106,17 @@ A flexible agent framework for building AI agents with MCP (Model Context Protoc
     lifespan=lifespan,
 )
 
-# CORS Middleware
-allowed_origins = os.getenv(
-    "ALLOWED_ORIGINS",
-    "http://localhost:5173,http://localhost:8000,http://localhost:3000"
-).split(",")
-logger.info(f"ALLOWED_ORIGINS: {allowed_origins}")
+# CORS Middleware. Parsed once; a frozenset makes the per-request origin
+# check a hash lookup, and stripping allows "http://a, http://b".
+allowed_origins = frozenset(
+    origin.strip()
+    for origin in os.getenv(
+        "ALLOWED_ORIGINS",
+        "http://localhost:5173,http://localhost:8000,http://localhost:3000"
+    ).split(",")
+    if origin.strip()
+)
+logger.info(f"ALLOWED_ORIGINS: {sorted(allowed_origins)}")
 
 app.add_middleware(
     CORSMiddleware,
@@ -58,56 +127,63 @@ app.add_middleware(
 )
 
 
+# /health and /api/info never change at runtime: encode them once here
+# instead of rebuilding and serializing the dicts on every request.
+# Same encoding options as JSONResponse.
+def _json_bytes(content: dict) -> bytes:
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+_HEALTH_BYTES = _json_bytes(
+    {
+        "status": "healthy",
+        "service": "machine-core",
+        "version": "0.1.2"
+    }
+)
+
+_INFO_BYTES = _json_bytes(
+    {
+        "name": "Machine Core",
+        "version": "0.1.2",
+        "description": "A flexible agent framework for building AI agents with MCP integration",
+        "features": [
+            "Clean Architecture",
+            "Flexible Configuration",
+            "MCP Integration",
+            "Multiple Agent Types",
+            "Streaming Support",
+            "Reusable Package"
+        ],
+        "agents": [
+            {"name": "ChatAgent", "description": "Streaming chat", "use_case": "Streamlit UI, web chat"},
+            {"name": "CLIAgent", "description": "Non-streaming", "use_case": "Terminal, cron jobs"},
+            {"name": "ReceiptProcessorAgent", "description": "Vision + queue", "use_case": "Document analysis"},
+            {"name": "TwitterBotAgent", "description": "Scheduled posting", "use_case": "Social media automation"},
+            {"name": "RAGChatAgent", "description": "Knowledge graph", "use_case": "Q&A, support"},
+            {"name": "MemoryMasterAgent", "description": "Knowledge extraction", "use_case": "Graph maintenance"}
+        ]
+    }
+)
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return JSONResponse(
-        content={
-            "status": "healthy",
-            "service": "machine-core",
-            "version": "0.1.2"
-        }
-    )
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
 
 
 @app.get("/api/info")
 async def get_info():
     """Get information about the Machine Core service."""
-    return JSONResponse(
-        content={
-            "name": "Machine Core",
-            "version": "0.1.2",
-            "description": "A flexible agent framework for building AI agents with MCP integration",
-            "features": [
-                "Clean Architecture",
-                "Flexible Configuration",
-                "MCP Integration",
-                "Multiple Agent Types",
-                "Streaming Support",
-                "Reusable Package"
-            ],
-            "agents": [
-                {"name": "ChatAgent", "description": "Streaming chat", "use_case": "Streamlit UI, web chat"},
-                {"name": "CLIAgent", "description": "Non-streaming", "use_case": "Terminal, cron jobs"},
-                {"name": "ReceiptProcessorAgent", "description": "Vision + queue", "use_case": "Document analysis"},
-                {"name": "TwitterBotAgent", "description": "Scheduled posting", "use_case": "Social media automation"},
-                {"name": "RAGChatAgent", "description": "Knowledge graph", "use_case": "Q&A, support"},
-                {"name": "MemoryMasterAgent", "description": "Knowledge extraction", "use_case": "Graph maintenance"}
-            ]
-        }
-    )
-
-
-# Prometheus metrics
-Instrumentator().instrument(app).expose(app)
-
-# Mount static files for frontend at root (must be last to avoid overriding API routes)
-frontend_path = Path(__file__).parent.parent / "frontend"
-if frontend_path.exists():
-    app.mount("/", StaticFiles(directory=str(frontend_path), html=True), name="frontend")
-    logger.info(f"Mounted frontend from {frontend_path}")
-else:
-    logger.warning(f"Frontend directory not found at {frontend_path}")
+    return Response(content=_INFO_BYTES, media_type="application/json")
+
+
+# Prometheus metrics. Middleware has to be added before the app starts;
+# the /metrics route is added in lifespan.
+instrumentator = Instrumentator().instrument(app)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+# Make the src layout importable without installing the package. The agents
+# import "core.agent_base", so the package directory goes on the path too.
+SRC = Path(__file__).resolve().parent.parent / "src"
+sys.path[:0] = [str(SRC), str(SRC / "machine_core")]
+
+from collections import OrderedDict, deque
+
+import pytest
+from pydantic_ai.models.test import TestModel
+
+from machine_core.core.agent_base import BaseAgent
+from machine_core.core.config import AgentConfig
+
+
+class _TestAgent(BaseAgent):
+    async def run(self, query: str):
+        return await self.run_query(query)
+
+
+@pytest.fixture
+def make_agent():
+    """Factory for agents running on a pydantic-ai test model.
+
+    Skips AgentCore.__init__, which resolves a real provider through
+    model-providers, and sets the attributes it would have set instead.
+    """
+
+    def _make(model=None, agent_cls=_TestAgent, **config):
+        agent = object.__new__(agent_cls)
+        agent.agent_config = AgentConfig(**config)
+        agent.system_prompt = "You are a test agent."
+        agent._image_cache = OrderedDict()
+        agent._http = None
+        agent._http_loop = None
+        agent._history_turns = deque()
+        agent._turn_tokens = deque()
+        agent._history_window = []
+        agent._history_store = None
+        agent.tools = []
+        agent.toolsets = []
+        agent.toolsets_unvalidated = []
+        agent.validation_warnings = []
+        agent._mcp_pool_key = None
+        agent._toolsets_ready = True
+        agent._ready_task = None
+        agent.model = model or TestModel()
+        agent.provider_type = "openai"
+        agent.context_window = agent.agent_config.context_window_tokens or None
+        agent._llm_cfg = None
+        agent.embedding = None
+        agent.embedding_model_name = None
+        agent._build_agent()
+        return agent
+
+    return _make
+
@@ -0,0 +1,243 @@
+import asyncio
+
+from pydantic_ai import BinaryContent, ImageUrl
+from pydantic_ai.exceptions import ModelHTTPError
+from pydantic_ai.messages import (
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+    UserPromptPart,
+)
+from pydantic_ai.models.function import DeltaThinkingPart, FunctionModel
+
+from machine_core.agents.chat_agent import ChatAgent
+from machine_core.core.agent_base import _StreamState
+from machine_core.core.agent_core import _MEDIA_TOKENS, _estimate_tokens
+from machine_core.core.config import get_history_summary_prompt
+
+
+def _drain(events) -> list[dict]:
+    async def _collect():
+        return [event async for event in events]
+
+    return asyncio.run(_collect())
+
+
+def test_estimate_tokens_counts_images_at_flat_rate():
+    data_url = "data:image/png;base64," + "A" * 400_000
+    text = ModelRequest(parts=[UserPromptPart(content=["Describe this"])])
+    with_image = ModelRequest(
+        parts=[UserPromptPart(content=["Describe this", ImageUrl(url=data_url)])]
+    )
+    with_binary = ModelRequest(
+        parts=[
+            UserPromptPart(
+                content=[
+                    "Describe this",
+                    BinaryContent(data=b"\0" * 300_000, media_type="image/png"),
+                ]
+            )
+        ]
+    )
+
+    base = _estimate_tokens([text])
+    assert _estimate_tokens([with_image]) == base + _MEDIA_TOKENS
+    assert _estimate_tokens([with_binary]) == base + _MEDIA_TOKENS
+
+
+def test_estimate_tokens_empty_history():
+    assert _estimate_tokens([]) == 0
+
+
+def test_stream_state_sends_first_delta_then_merges():
+    state = _StreamState(coalesce_s=60.0)
+    assert state.emit({"type": "text_delta", "content": "a"}) == (
+        {"type": "text_delta", "content": "a"},
+    )
+    assert state.emit({"type": "text_delta", "content": "b"}) == ()
+    assert state.emit({"type": "text_delta", "content": "c"}) == ()
+    assert state.emit({"type": "tool_call"}) == (
+        {"type": "text_delta", "content": "bc"},
+        {"type": "tool_call"},
+    )
+    assert state.flush() is None
+
+
+def test_chat_agent_text_only_drops_thinking(make_agent):
+    async def stream(messages, info):
+        yield {0: DeltaThinkingPart(content="")}
+        yield {0: DeltaThinkingPart(content="hmm")}
+        yield ""
+        yield "hello"
+
+    agent = make_agent(FunctionModel(stream_function=stream), agent_cls=ChatAgent)
+    events = _drain(agent.run("hi", text_only=True))
+    assert [e["type"] for e in events] == ["text_delta", "final"]
+    assert events[-1]["content"] == "hello"
+
+    events = _drain(agent.run("hi"))
+    assert "thinking_delta" in [e["type"] for e in events]
+
+
+def _flaky_model(calls: list):
+    """Model whose first request fails with a 503 and later ones answer 'ok'."""
+
+    def reply(messages, info):
+        calls.append(None)
+        if len(calls) == 1:
+            raise ModelHTTPError(503, "test", "overloaded")
+        return ModelResponse(parts=[TextPart("ok")])
+
+    async def stream(messages, info):
+        calls.append(None)
+        if len(calls) == 1:
+            raise ModelHTTPError(503, "test", "overloaded")
+        yield ""
+        yield "ok"
+
+    return FunctionModel(reply, stream_function=stream)
+
+
+def test_run_query_retries_transient_failure(make_agent):
+    calls = []
+    agent = make_agent(_flaky_model(calls), retry_base_delay=0.0)
+    result = asyncio.run(agent.run_query("hi"))
+    assert result.output == "ok"
+    assert len(calls) == 2
+
+
+def test_stream_retries_failure_before_first_event(make_agent):
+    calls = []
+    agent = make_agent(_flaky_model(calls), retry_base_delay=0.0)
+    events = _drain(agent.run_query_stream("hi"))
+    assert [e["type"] for e in events] == ["text_delta", "final"]
+    assert events[-1]["content"] == "ok"
+    assert len(calls) == 2
+
+
+def test_stream_gives_up_after_query_retries(make_agent):
+    calls = []
+    agent = make_agent(_flaky_model(calls), query_retries=0)
+    events = _drain(agent.run_query_stream("hi"))
+    assert [e["type"] for e in events] == ["error"]
+    assert len(calls) == 1
+
+
+def _summarizing_model(prompts: list):
+    """Model that answers summary requests with 'SUMMARY' and echoes the rest."""
+
+    def reply(messages, info):
+        prompt = messages[-1].parts[-1].content
+        prompts.append(prompt)
+        if prompt.startswith(get_history_summary_prompt()):
+            return ModelResponse(parts=[TextPart("SUMMARY")])
+        return ModelResponse(parts=[TextPart("x" * 400)])
+
+    return FunctionModel(reply)
+
+
+def test_history_tokens_track_turns(make_agent):
+    agent = make_agent(context_window_turns=2)
+    turns = [
+        [
+            ModelRequest(parts=[UserPromptPart(f"question {i}")]),
+            ModelResponse(parts=[TextPart("y" * 100 * (i + 1))]),
+        ]
+        for i in range(3)
+    ]
+    for turn in turns:
+        agent._append_messages(turn)
+    # The oldest turn was dropped and the system prompt re-added to the head
+    assert isinstance(agent.message_history[0].parts[0], SystemPromptPart)
+    assert agent.history_tokens == sum(
+        _estimate_tokens(turn) for turn in agent._history_turns
+    )
+    assert len(agent.message_history) == 4
+
+
+def test_compaction_summarizes_oldest_half(make_agent):
+    prompts = []
+    agent = make_agent(_summarizing_model(prompts), context_window_tokens=1000)
+    for i in range(4):
+        asyncio.run(agent.run_query(f"question {i}"))
+    # Four ~100-token answers fit; the fifth query starts over budget
+    assert agent.history_tokens > 800
+    asyncio.run(agent.run_query("question 4"))
+
+    assert any(p.startswith(get_history_summary_prompt()) for p in prompts)
+    history = agent.message_history
+    assert history[1].parts[0].content == "SUMMARY"
+    # summary turn + 2 kept turns + the new one
+    assert len(agent._history_turns) == 4
+    assert agent.history_tokens == sum(
+        _estimate_tokens(turn) for turn in agent._history_turns
+    )
+
+
+def test_compaction_off_without_context_window(make_agent):
+    prompts = []
+    agent = make_agent(_summarizing_model(prompts))
+    for i in range(6):
+        asyncio.run(agent.run_query(f"question {i}"))
+    assert len(prompts) == 6
+
+
+def _echo_model(seen: list):
+    """Model that answers with the prompt text and records history lengths."""
+
+    def reply(messages, info):
+        seen.append(len(messages))
+        content = messages[-1].parts[-1].content
+        text = content if isinstance(content, str) else content[0]
+        images = 0 if isinstance(content, str) else len(content) - 1
+        return ModelResponse(parts=[TextPart(f"{text}:{images}")])
+
+    return FunctionModel(reply)
+
+
+def test_run_query_batch_keeps_order_and_history(make_agent, tmp_path):
+    image = tmp_path / "a.png"
+    image.write_bytes(b"\x89PNG\r\n\x1a\n")
+    seen = []
+    agent = make_agent(_echo_model(seen))
+    agent.message_history = [
+        ModelRequest(parts=[UserPromptPart("earlier")]),
+        ModelResponse(parts=[TextPart("reply")]),
+    ]
+
+    results = asyncio.run(
+        agent.run_query_batch(
+            ["one", "", "two", "three"],
+            max_concurrency=2,
+            image_paths=[None, None, [str(image)], str(tmp_path / "missing.png")],
+        )
+    )
+    assert results[0].output == "one:0"
+    assert results[1] == {"output": "Error: No query provided."}
+    assert results[2].output == "two:1"
+    assert results[3]["output"].startswith("Error: Failed to process image")
+    # Every query ran without history, and the agent's history is untouched
+    assert seen == [1, 1]
+    assert len(agent.message_history) == 2
+
+
+def test_image_cache_reuses_unchanged_file(make_agent, tmp_path):
+    image = tmp_path / "a.png"
+    image.write_bytes(b"\x89PNG\r\n\x1a\n" + b"\0" * 16)
+    agent = make_agent()
+
+    async def load_twice():
+        try:
+            return await agent._image_url(image), await agent._image_url(image)
+        finally:
+            if agent._http is not None:
+                await agent._http.aclose()
+
+    first, second = asyncio.run(load_twice())
+    assert first is second
+    assert len(agent._image_cache) == 1
+
+    # data: URLs are passed through and never cached
+    asyncio.run(agent._image_url(first.url))
+    assert len(agent._image_cache) == 1
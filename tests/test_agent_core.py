@@ -0,0 +1,106 @@
+import asyncio
+from types import SimpleNamespace
+
+from machine_core.core import agent_core
+from machine_core.core.agent_core import AgentCore
+from machine_core.core.config import AgentConfig
+
+
+def _core(provider_type, **config):
+    # Skip __init__: it resolves a real provider through model-providers
+    core = object.__new__(AgentCore)
+    core.agent_config = AgentConfig(**config)
+    core.system_prompt = "You are a test agent."
+    core.provider_type = provider_type
+    return core
+
+
+def test_model_settings_openai_sets_prompt_cache_key():
+    core = _core("openai")
+    assert core._model_settings() == {
+        "openai_prompt_cache_key": core.prompt_cache_key
+    }
+
+
+def test_model_settings_anthropic_caches_prefix():
+    assert _core("anthropic")._model_settings() == {
+        "anthropic_cache_instructions": True,
+        "anthropic_cache_tool_definitions": True,
+    }
+
+
+def test_model_settings_empty_for_google_or_when_disabled():
+    assert _core("google")._model_settings() == {}
+    assert _core("openai", prompt_cache=False)._model_settings() == {}
+
+
+def test_mcp_pool_shares_toolsets_and_releases_them():
+    key = ("test-pool", 1.0, 1, True)
+    created = []
+
+    def create():
+        created.append(1)
+        return ["server"], ["warning"]
+
+    first = agent_core._acquire_pooled_toolsets(key, create)
+    second = agent_core._acquire_pooled_toolsets(key, create)
+    assert first == second == (["server"], ["warning"])
+    assert len(created) == 1
+    assert agent_core._pooled_validation(key) is None
+
+    agent_core._store_pooled_validation(key, ["validated"], [])
+    assert agent_core._pooled_validation(key) == (["validated"], [])
+
+    agent_core._release_pooled_toolsets(key)
+    assert key in agent_core._MCP_POOL
+    agent_core._release_pooled_toolsets(key)
+    assert key not in agent_core._MCP_POOL
+
+
+class _SlowToolset:
+    """Stands in for an MCP server with one broken tool; counts list_tools()."""
+
+    def __init__(self):
+        self.listed = 0
+
+    async def list_tools(self):
+        self.listed += 1
+        await asyncio.sleep(0.01)
+        return [SimpleNamespace(name="broken", inputSchema={"properties": {"x": {}}})]
+
+
+def test_concurrent_aready_validates_once(make_agent):
+    agent = make_agent()
+    toolset = _SlowToolset()
+    agent.toolsets = agent.toolsets_unvalidated = [toolset]
+    agent._toolsets_ready = False
+    rebuilds = []
+    rebuild = agent.rebuild_agent
+    agent.rebuild_agent = lambda **kw: rebuilds.append(1) or rebuild(**kw)
+
+    async def ready_many():
+        await asyncio.gather(*(agent.aready() for _ in range(5)))
+
+    asyncio.run(ready_many())
+    assert toolset.listed == 1
+    assert agent._toolsets_ready
+    assert len(rebuilds) == 1
+    assert agent.toolsets[0].wrapped_toolset is toolset
+    assert agent._ready_task is None
+
+
+def test_aready_reuses_pooled_validation(make_agent):
+    key = ("test-pool-validated", 1.0, 1, True)
+    toolset = _SlowToolset()
+    agent_core._acquire_pooled_toolsets(key, lambda: ([toolset], []))
+    agent_core._store_pooled_validation(key, [toolset], ["pooled warning"])
+    try:
+        agent = make_agent()
+        agent._mcp_pool_key = key
+        agent.toolsets = agent.toolsets_unvalidated = [toolset]
+        agent._toolsets_ready = False
+        asyncio.run(agent.aready())
+        assert toolset.listed == 0
+        assert agent.validation_warnings == ["pooled warning"]
+    finally:
+        agent_core._release_pooled_toolsets(key)
@@ -0,0 +1,20 @@
+import pytest
+
+from machine_core.core.config import Config, get_config
+
+
+def test_legacy_agent_settings_class_access():
+    assert Config.Agent.MAX_ITERATIONS == get_config().max_iterations
+
+
+def test_legacy_agent_settings_instance_access():
+    agent = Config.Agent()
+    assert agent.MAX_ITERATIONS == get_config().max_iterations
+    assert agent.TIMEOUT == get_config().timeout
+
+
+def test_legacy_agent_settings_unknown_name():
+    with pytest.raises(AttributeError):
+        Config.Agent.not_a_setting
+    with pytest.raises(AttributeError):
+        Config.Agent().not_a_setting
@@ -0,0 +1,46 @@
+import asyncio
+import base64
+import os
+
+import httpx
+import pytest
+
+from machine_core.core.file_processor import FileProcessor
+
+PAYLOAD = os.urandom(200_001)  # not a multiple of 3 or of the chunk size
+
+
+def _fetch(content_length):
+    def handler(request):
+        response = httpx.Response(
+            200, headers={"content-type": "image/png"}, content=PAYLOAD
+        )
+        if content_length is None:
+            del response.headers["content-length"]
+        else:
+            response.headers["content-length"] = content_length
+        return response
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await FileProcessor.prepare_for_vlm(
+                "https://example.com/receipt.png", client
+            )
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("content_length", [str(len(PAYLOAD)), None, "10", "999999"])
+def test_streamed_download_matches_one_shot_encoding(content_length):
+    expected = "data:image/png;base64," + base64.b64encode(PAYLOAD).decode()
+    assert _fetch(content_length) == expected
+
+
+def test_local_file_and_data_url(tmp_path):
+    image = tmp_path / "photo.jpg"
+    image.write_bytes(PAYLOAD[:300])
+    data_url = asyncio.run(FileProcessor.prepare_for_vlm(image))
+    assert data_url == "data:image/jpeg;base64," + base64.b64encode(
+        PAYLOAD[:300]
+    ).decode()
+    assert asyncio.run(FileProcessor.prepare_for_vlm(data_url)) == data_url
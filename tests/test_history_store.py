@@ -0,0 +1,92 @@
+import sqlite3
+
+from pydantic_ai.messages import ModelRequest, ModelResponse, TextPart, UserPromptPart
+
+from machine_core.core.history_store import HistoryStore
+
+
+def _turn(text: str) -> list:
+    return [
+        ModelRequest(parts=[UserPromptPart(f"{text} q")]),
+        ModelResponse(parts=[TextPart(f"{text} a")]),
+    ]
+
+
+def _prompts(turns: list) -> list[str]:
+    return [turn[0].parts[0].content for turn in turns]
+
+
+def test_sessions_sharing_a_file_stay_apart(tmp_path):
+    path = str(tmp_path / "history.db")
+    first = HistoryStore(path, session="a1")
+    second = HistoryStore(path, session="a2")
+    first.append_turn(_turn("a1"))
+    second.append_turn(_turn("a2"))
+    first.append_turn(_turn("a1 again"))
+    first.close()
+    second.close()
+
+    restored = HistoryStore(path, session="a1")
+    assert _prompts(restored.load_turns()) == ["a1 q", "a1 again q"]
+    restored.close()
+
+
+def test_turn_numbers_come_from_the_database(tmp_path):
+    # Two stores on one session stand in for two processes
+    path = str(tmp_path / "history.db")
+    first = HistoryStore(path, session="s")
+    second = HistoryStore(path, session="s")
+    first.append_turn(_turn("one"))
+    first.flush()
+    second.append_turn(_turn("two"))
+    second.flush()
+    first.append_turn(_turn("three"))
+
+    assert _prompts(first.load_turns()) == ["one q", "two q", "three q"]
+    assert _prompts(first.load_turns(limit=2)) == ["two q", "three q"]
+    first.close()
+    second.close()
+
+
+def test_close_writes_queued_turns(tmp_path):
+    path = str(tmp_path / "history.db")
+    store = HistoryStore(path)
+    for i in range(20):
+        store.append_turn(_turn(str(i)))
+    store.close()
+
+    reopened = HistoryStore(path)
+    assert len(reopened.load_turns()) == 20
+    reopened.close()
+
+
+def test_opens_database_without_session_column(tmp_path):
+    path = str(tmp_path / "history.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE messages (turn INTEGER NOT NULL, role TEXT NOT NULL, "
+        "payload BLOB NOT NULL)"
+    )
+    conn.commit()
+    conn.close()
+
+    store = HistoryStore(path, session="new")
+    store.append_turn(_turn("new"))
+    assert _prompts(store.load_turns()) == ["new q"]
+    store.close()
+
+
+def test_agents_restore_only_their_session(make_agent, tmp_path):
+    path = str(tmp_path / "history.db")
+    for session in ("a1", "a2"):
+        agent = make_agent()
+        agent._history_store = HistoryStore(path, session=session)
+        agent._append_messages(_turn(session))
+        agent._history_store.close()
+
+    third = make_agent()
+    third._history_store = HistoryStore(path, session="a1")
+    third.restore_history()
+    third._history_store.close()
+    assert len(third.message_history) == 2
+    assert third.message_history[0].parts[-1].content == "a1 q"
@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+
+
+def _loaded_after(statement: str, modules: list[str]) -> list[bool]:
+    """Run statement in a fresh interpreter; report which modules got imported."""
+    code = f"import sys; {statement}; print([m in sys.modules for m in {modules!r}])"
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    out = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return eval(out.strip().splitlines()[-1])
+
+
+def test_package_import_is_lazy():
+    assert _loaded_after(
+        "import machine_core", ["machine_core.core.agent_base", "pydantic_ai"]
+    ) == [False, False]
+
+
+def test_memory_master_does_not_import_rag_agent():
+    assert _loaded_after(
+        "import machine_core.agents.memory_master_agent",
+        ["machine_core.agents.rag_chat_agent"],
+    ) == [False]
+
+
+def test_lazy_names_resolve():
+    assert _loaded_after(
+        "from machine_core import BaseAgent, AgentConfig",
+        ["machine_core.core.agent_base"],
+    ) == [True]
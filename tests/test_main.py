@@ -0,0 +1,42 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("prometheus_fastapi_instrumentator")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    (tmp_path / "index.html").write_text("<html>app</html>")
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "assets" / "app.js").write_text("console.log(1)")
+    monkeypatch.setattr(main, "frontend_path", tmp_path)
+    monkeypatch.setattr(main, "SERVE_FRONTEND", True)
+    main._frontend_files.clear()
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def test_health_and_info(client):
+    assert client.get("/health").json()["status"] == "healthy"
+    assert client.get("/api/info").json()["name"] == "Machine Core"
+
+
+def test_frontend_etag_revalidation(client):
+    first = client.get("/assets/app.js")
+    assert first.status_code == 200
+    assert first.text == "console.log(1)"
+    etag = first.headers["etag"]
+
+    again = client.get("/assets/app.js", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+
+
+def test_frontend_spa_routes_and_missing_files(client):
+    assert client.get("/").text == "<html>app</html>"
+    assert client.get("/settings/profile").text == "<html>app</html>"
+    assert client.get("/missing.css").status_code == 404
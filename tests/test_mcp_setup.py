@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+from machine_core.core import mcp_setup
+from machine_core.core.mcp_setup import _cached_schema_issues
+
+
+def _tool(name: str, prop_type) -> SimpleNamespace:
+    return SimpleNamespace(
+        name=name, inputSchema={"properties": {"x": {"type": prop_type}}}
+    )
+
+
+def test_schema_issues_cache_reuses_identical_manifest(monkeypatch):
+    walks = []
+    walk = mcp_setup._schema_issues
+    monkeypatch.setattr(
+        mcp_setup, "_schema_issues", lambda tools: walks.append(1) or walk(tools)
+    )
+    mcp_setup._SCHEMA_ISSUES_CACHE.clear()
+
+    tools = [_tool("good", "string"), _tool("bad", [])]
+    first = _cached_schema_issues(tools)
+    second = _cached_schema_issues([_tool("good", "string"), _tool("bad", [])])
+    assert first[0] == second[0] == frozenset({"bad"})
+    assert first[1] == second[1]
+    assert len(walks) == 1
+
+    # Same names, changed schema: walked again
+    fixed = _cached_schema_issues([_tool("good", "string"), _tool("bad", "string")])
+    assert fixed[0] == frozenset()
+    assert len(walks) == 2
+
+
+def test_schema_issues_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(mcp_setup, "_SCHEMA_ISSUES_CACHE_SIZE", 2)
+    mcp_setup._SCHEMA_ISSUES_CACHE.clear()
+    for name in ("a", "b", "c"):
+        _cached_schema_issues([_tool(name, "string")])
+    assert len(mcp_setup._SCHEMA_ISSUES_CACHE) == 2
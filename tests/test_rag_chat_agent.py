@@ -0,0 +1,76 @@
+import asyncio
+
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+
+from machine_core.agents.rag_chat_agent import RAGChatAgent
+
+
+def _drain(events) -> list[dict]:
+    async def _collect():
+        return [event async for event in events]
+
+    return asyncio.run(_collect())
+
+
+def _counting_model(calls: list):
+    """Model that records the history it was sent and answers 'answer N'."""
+
+    async def stream(messages, info):
+        calls.append(len(messages))
+        # Text in the part-start event isn't forwarded, so stream a delta
+        yield ""
+        yield f"answer {len(calls)}"
+
+    def reply(messages, info):
+        calls.append(len(messages))
+        return ModelResponse(parts=[TextPart(f"answer {len(calls)}")])
+
+    return FunctionModel(reply, stream_function=stream)
+
+
+def test_cache_hit_records_turn_for_follow_up(make_agent):
+    RAGChatAgent.invalidate_cache()
+    calls = []
+    first = make_agent(_counting_model(calls), agent_cls=RAGChatAgent)
+    events = _drain(first.run("What is X?"))
+    assert events[-1]["content"] == "answer 1"
+
+    # Same question in a new conversation: replayed, but still recorded
+    second = make_agent(_counting_model(calls), agent_cls=RAGChatAgent)
+    events = _drain(second.run("  what is x?"))
+    assert events[-1]["content"] == "answer 1"
+    assert len(calls) == 1
+    assert len(second.message_history) == 2
+
+    # The follow-up is a miss and reaches the model with the cached turn
+    events = _drain(second.run("And Y?"))
+    assert events[-1]["content"] == "answer 2"
+    assert calls == [1, 3]
+    assert len(second.message_history) == 4
+
+
+def test_follow_up_after_replayed_turn_hits_cache(make_agent):
+    RAGChatAgent.invalidate_cache()
+    calls = []
+    first = make_agent(_counting_model(calls), agent_cls=RAGChatAgent)
+    _drain(first.run("What is X?"))
+    _drain(first.run("And Y?"))
+
+    second = make_agent(_counting_model(calls), agent_cls=RAGChatAgent)
+    _drain(second.run("What is X?"))
+    events = _drain(second.run("And Y?"))
+    assert events[-1]["content"] == "answer 2"
+    assert len(calls) == 2
+    assert len(second.message_history) == 4
+
+
+def test_same_question_after_different_history_misses(make_agent):
+    RAGChatAgent.invalidate_cache()
+    calls = []
+    agent = make_agent(_counting_model(calls), agent_cls=RAGChatAgent)
+    _drain(agent.run("And Y?"))
+    other = make_agent(_counting_model(calls), agent_cls=RAGChatAgent)
+    _drain(other.run("What is X?"))
+    _drain(other.run("And Y?"))
+    assert len(calls) == 3
@@ -0,0 +1,21 @@
+import asyncio
+
+from machine_core.agents.receipt_processor_agent import ReceiptProcessorAgent
+
+
+def test_prefetch_bypasses_image_cache(make_agent, tmp_path):
+    receipt = tmp_path / "receipt.png"
+    receipt.write_bytes(b"\x89PNG\r\n\x1a\n" + b"\0" * 64)
+    missing = tmp_path / "missing.png"
+    agent = make_agent(agent_cls=ReceiptProcessorAgent)
+
+    async def prefetch():
+        try:
+            return await agent._prefetch_images([str(receipt), str(missing)])
+        finally:
+            await agent._http.aclose()
+
+    loaded = asyncio.run(prefetch())
+    assert loaded[0].startswith("data:image/png;base64,")
+    assert loaded[1] == str(missing)
+    assert not agent._image_cache
@@ -0,0 +1,87 @@
+import asyncio
+
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+
+from machine_core.agents.cli_agent import CLIAgent
+from machine_core.core.result_cache import CachedRunResult, ResultCache
+
+
+def _counting_model(calls: list):
+    def reply(messages, info):
+        calls.append(len(messages))
+        return ModelResponse(parts=[TextPart(f"answer {len(calls)}")])
+
+    async def stream(messages, info):
+        calls.append(len(messages))
+        yield ""
+        yield f"answer {len(calls)}"
+
+    return FunctionModel(reply, stream_function=stream)
+
+
+def test_repeated_question_hits_despite_new_history(make_agent, tmp_path):
+    calls = []
+    db = str(tmp_path / "history.db")
+    agent = make_agent(
+        _counting_model(calls), enable_result_cache=True, history_db_path=db
+    )
+    first = asyncio.run(agent.run_query("What is X?"))
+    second = asyncio.run(agent.run_query("What is X?"))
+
+    assert isinstance(second, CachedRunResult)
+    assert second.output == first.output == "answer 1"
+    assert len(calls) == 1
+    assert len(agent.message_history) == 4
+
+
+def test_cache_is_shared_through_the_database_file(make_agent, tmp_path):
+    calls = []
+    db = str(tmp_path / "history.db")
+    writer = make_agent(
+        _counting_model(calls), enable_result_cache=True, history_db_path=db
+    )
+    asyncio.run(writer.run_query("What is X?"))
+
+    # A second connection to the file stands in for another process
+    key = writer._result_cache_key("What is X?", [])
+    assert ResultCache(db).get(key).output == "answer 1"
+
+
+def test_cli_agent_uses_result_cache(make_agent, tmp_path):
+    calls = []
+    db = str(tmp_path / "history.db")
+    first = make_agent(
+        _counting_model(calls),
+        agent_cls=CLIAgent,
+        enable_result_cache=True,
+        history_db_path=db,
+    )
+    assert asyncio.run(first.run("What is X?")).output == "answer 1"
+
+    second = make_agent(
+        _counting_model(calls),
+        agent_cls=CLIAgent,
+        enable_result_cache=True,
+        history_db_path=db,
+    )
+    assert asyncio.run(second.run("What is X?")).output == "answer 1"
+    assert len(calls) == 1
+    assert len(second.message_history) == 2
+
+
+def test_disabled_cache_always_calls_model(make_agent):
+    calls = []
+    agent = make_agent(_counting_model(calls))
+    asyncio.run(agent.run_query("What is X?"))
+    asyncio.run(agent.run_query("What is X?"))
+    assert len(calls) == 2
+
+
+def test_result_cache_evicts_oldest(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.db"), max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, key, [])
+    assert cache.get("a") is None
+    assert cache.get("b").output == "b"
+    assert cache.get("c").output == "c"
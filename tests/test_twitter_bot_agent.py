@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+from machine_core.agents import twitter_bot_agent
+from machine_core.agents.twitter_bot_agent import TwitterBotAgent
+
+
+def _bot(make_agent, state_path, limit: int = 3) -> TwitterBotAgent:
+    bot = make_agent(agent_cls=TwitterBotAgent)
+    bot.daily_tweet_limit = limit
+    bot.state_path = state_path
+    bot.tweets_today = 0
+    bot.next_allowed_ts = 0.0
+    bot._done = None
+    bot._timer = None
+    bot._task = None
+    return bot
+
+
+def _post_without_llm(bot: TwitterBotAgent):
+    async def post():
+        bot.tweets_today += 1
+        bot._save_state()
+
+    bot.generate_and_post_once = post
+
+
+def test_posts_up_to_daily_limit_and_saves_state(make_agent, monkeypatch, tmp_path):
+    monkeypatch.setattr(twitter_bot_agent.random, "randint", lambda a, b: 0)
+    state = tmp_path / "state.json"
+    bot = _bot(make_agent, state)
+    _post_without_llm(bot)
+
+    asyncio.run(asyncio.wait_for(bot.run(), 5))
+    assert bot.tweets_today == 3
+    assert json.loads(state.read_text())["tweets_today"] == 3
+
+
+def test_state_write_failure_does_not_stall_run(make_agent, monkeypatch, tmp_path):
+    monkeypatch.setattr(twitter_bot_agent.random, "randint", lambda a, b: 0)
+    # A directory can't be written as a file
+    bot = _bot(make_agent, tmp_path)
+    _post_without_llm(bot)
+
+    asyncio.run(asyncio.wait_for(bot.run(), 5))
+    assert bot.tweets_today == 3
+
+
+def test_cleanup_cancels_in_flight_tweet(make_agent, tmp_path):
+    bot = _bot(make_agent, tmp_path / "state.json")
+
+    async def never_finishes():
+        await asyncio.sleep(3600)
+
+    bot.generate_and_post_once = never_finishes
+
+    async def run_then_cleanup():
+        runner = asyncio.create_task(bot.run())
+        while bot._task is None:
+            await asyncio.sleep(0)
+        task = bot._task
+        await bot.cleanup()
+        await asyncio.wait_for(runner, 1)
+        return task
+
+    task = asyncio.run(run_then_cleanup())
+    assert task.cancelled()
+    assert bot._timer is None